@@ -0,0 +1,186 @@
+"""Admission control for concurrent JSON-RPC requests
+
+异步模式和 HTTP 传输下，JsonRPCServer 在执行每个请求前先向 AdmissionController
+申请名额：
+
+- 全局最多 max_in_flight 个请求同时执行
+- tools/call 还要满足该工具自己的并发上限（tool_limits），慢工具不会占满全局名额
+- 拿不到名额的请求进入等待队列，队列最多 max_queue 个；队列已满，或等待超过
+  max_queue_wait 秒时，请求立即失败，返回可重试的 OVERLOADED_ERROR
+
+名额释放时按到达顺序唤醒队列中可以执行的请求；被工具上限卡住的请求不会挡住
+其它工具的请求。所有操作（包括 stats()）都在事件循环线程中进行，不需要加锁。
+同步模式一次只处理一条消息，批量请求也不经过准入控制。
+stats() 返回当前并发数、队列深度和拒绝次数，通过 `admission/stats` 读取。
+"""
+
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Any
+
+# JSON-RPC 保留给服务端实现的错误码，客户端应稍后重试
+OVERLOADED_ERROR = -32000
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request can neither run nor wait in the queue"""
+
+
+class _Waiter:
+    __slots__ = ("tool", "future")
+
+    def __init__(self, tool: str | None, future: asyncio.Future):
+        self.tool: str | None = tool
+        self.future: asyncio.Future = future
+
+
+class AdmissionController:
+    """Global and per-tool concurrency limits with a bounded FIFO queue"""
+
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        max_queue: int = 64,
+        tool_limits: dict[str, int] | None = None,
+        max_queue_wait: float | None = None,
+    ):
+        self.max_in_flight: int = max_in_flight
+        self.max_queue: int = max_queue
+        self.tool_limits: dict[str, int] = dict(tool_limits or {})
+        self.max_queue_wait: float | None = max_queue_wait
+
+        self.in_flight: int = 0
+        self._tool_in_flight: Counter[str] = Counter()
+        self._queue: deque[_Waiter] = deque()
+
+        self.admitted: int = 0
+        self.queued: int = 0
+        self.rejected: int = 0
+        self.timed_out: int = 0
+        self.peak_queue_depth: int = 0
+        self._tool_rejected: Counter[str] = Counter()
+        # 排队请求的累计等待时间，用来计算平均等待
+        self._queue_wait_total: float = 0.0
+
+    def _can_run(self, tool: str | None) -> bool:
+        if self.in_flight >= self.max_in_flight:
+            return False
+        if tool is None:
+            return True
+        limit = self.tool_limits.get(tool)
+        return limit is None or self._tool_in_flight[tool] < limit
+
+    def _start(self, tool: str | None) -> None:
+        self.in_flight += 1
+        self.admitted += 1
+        if tool is not None:
+            self._tool_in_flight[tool] += 1
+
+    async def acquire(self, tool: str | None = None) -> None:
+        """
+        Wait for a slot
+
+        Args:
+            tool (str, optional): the tool of a tools/call request, for its own limit
+
+        Raises:
+            AdmissionRejected: the queue is full or the wait exceeded max_queue_wait
+        """
+        if self._can_run(tool):
+            self._start(tool)
+            return
+
+        if len(self._queue) >= self.max_queue:
+            self._reject(tool)
+            raise AdmissionRejected(
+                f"Server overloaded: {self.in_flight} requests running and "
+                f"{len(self._queue)} queued, retry later"
+            )
+
+        waiter = _Waiter(tool, asyncio.get_running_loop().create_future())
+        self._queue.append(waiter)
+        self.queued += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, len(self._queue))
+        began = time.perf_counter()
+        try:
+            if self.max_queue_wait is None:
+                await waiter.future
+            else:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.max_queue_wait)
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 名额已经分配给这个请求，交还给下一个
+                self.release(tool)
+            else:
+                waiter.future.cancel()
+                self._queue.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                self._reject(tool)
+                raise AdmissionRejected(
+                    f"Server overloaded: waited {self.max_queue_wait}s for a slot, retry later"
+                ) from None
+            raise
+        finally:
+            self._queue_wait_total += time.perf_counter() - began
+
+    def release(self, tool: str | None = None) -> None:
+        """Give back the slot taken by acquire() and start queued requests"""
+        self.in_flight -= 1
+        if tool is not None:
+            self._tool_in_flight[tool] -= 1
+            if not self._tool_in_flight[tool]:
+                del self._tool_in_flight[tool]
+
+        if not self._queue:
+            return
+        queue = self._queue
+        skipped: list[_Waiter] = []
+        # 全局名额用完就停止，队列后面的请求不再逐个检查
+        while queue and self.in_flight < self.max_in_flight:
+            waiter = queue.popleft()
+            if waiter.future.done():
+                continue
+            if self._can_run(waiter.tool):
+                self._start(waiter.tool)
+                waiter.future.set_result(None)
+            else:
+                skipped.append(waiter)
+        # 被工具上限卡住的请求放回队首，保持到达顺序
+        queue.extendleft(reversed(skipped))
+
+    def _reject(self, tool: str | None) -> None:
+        self.rejected += 1
+        if tool is not None:
+            self._tool_rejected[tool] += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Counters and queue state, must be called on the event loop thread"""
+        queue = self._queue
+        tool_in_flight = self._tool_in_flight
+        queued_by_tool = Counter(w.tool for w in queue if w.tool is not None)
+        names = self.tool_limits.keys() | tool_in_flight.keys() | self._tool_rejected.keys()
+        tools = {}
+        for tool in sorted(names):
+            tools[tool] = {
+                "limit": self.tool_limits.get(tool),
+                "inFlight": tool_in_flight.get(tool, 0),
+                "queued": queued_by_tool.get(tool, 0),
+                "rejected": self._tool_rejected.get(tool, 0),
+            }
+        return {
+            "maxInFlight": self.max_in_flight,
+            "maxQueue": self.max_queue,
+            "inFlight": self.in_flight,
+            "queueDepth": len(queue),
+            "peakQueueDepth": self.peak_queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timedOut": self.timed_out,
+            "avgQueueWaitSeconds": (
+                self._queue_wait_total / self.queued if self.queued else None
+            ),
+            "tools": tools,
+        }
@@ -0,0 +1,54 @@
+"""Micro-benchmark: JSON-RPC method dispatch.
+
+Compares the old per-request `inspect.signature` filtering with the
+precompiled `MethodBinder` path used by `JsonRPCServer`.
+
+    uv run python benchmarks/bench_dispatch.py
+"""
+
+import inspect
+import os
+import sys
+import time
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_server import MethodBinder  # noqa: E402
+
+N = 200_000
+
+
+def call_tool(name: str, arguments: dict | None = None) -> dict:
+    return {"name": name}
+
+
+def legacy_invoke(func, params: dict[str, Any]) -> Any:
+    """基线：改造前 process_request 中的参数过滤逻辑"""
+    sig = inspect.signature(func)
+    filtered_params = {}
+    for key, value in params.items():
+        if key in sig.parameters:
+            filtered_params[key] = value
+        elif "**" in str(sig):
+            filtered_params[key] = value
+    return func(**filtered_params)
+
+
+def bench(label: str, invoke, params: dict[str, Any]) -> float:
+    start = time.perf_counter()
+    for _ in range(N):
+        invoke(params)
+    elapsed = time.perf_counter() - start
+    rate = N / elapsed
+    print(f"{label:<32} {rate:>12,.0f} req/s  {elapsed / N * 1e6:6.2f} us/req")
+    return rate
+
+
+if __name__ == "__main__":
+    params = {"name": "get_weather", "arguments": {"location": "Beijing"}}
+    binder = MethodBinder("tools/call", call_tool)
+
+    before = bench("inspect.signature per call", lambda p: legacy_invoke(call_tool, p), params)
+    after = bench("precompiled MethodBinder", binder, params)
+    print(f"speedup: {after / before:.1f}x")
@@ -0,0 +1,118 @@
+"""Benchmark: import cost and spawn-to-first-response of the server.
+
+Each module is imported in a fresh interpreter with `python -X importtime`;
+the cumulative time of the module itself is reported (best of ROUNDS), along
+with the heaviest imports it pulls in. Interpreter startup (site, encodings)
+is not included.
+
+The last table spawns `mcp_server.py` and measures the time until the
+response to `initialize` arrives, which is what an MCP client waits for.
+
+    uv run python benchmarks/bench_import.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROUNDS = 10
+TOP = 8
+
+MODULES = {
+    "tool_registry": "import tool_registry",
+    "serializer": "import serializer",
+    "mcp_server": "import mcp_server",
+    "client/tools": f"import sys; sys.path.insert(0, {os.path.join(ROOT, 'client')!r}); import tools",
+}
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 0,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-06-18",
+        "capabilities": {},
+        "clientInfo": {"name": "bench", "version": "1.0"},
+    },
+}
+
+
+def import_times(code: str, module: str) -> tuple[int, list[tuple[int, str]]]:
+    """
+    Run code with -X importtime
+
+    Returns the cumulative µs of module and the (cumulative µs, name) of every
+    import it pulled in. importtime prints children before their parent, one
+    indentation level deeper, so those are the deeper lines right above it.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    lines = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # 表头
+        depth = len(name) - len(name.lstrip())
+        lines.append((depth, int(cumulative), name.strip()))
+
+    index = max(i for i, (depth, _, name) in enumerate(lines) if name == module)
+    depth, total, _ = lines[index]
+    children = []
+    for child_depth, cumulative, name in reversed(lines[:index]):
+        if child_depth <= depth:
+            break
+        children.append((cumulative, name))
+    return total, children
+
+
+def bench_imports() -> None:
+    print(f"import time, best of {ROUNDS}")
+    for label, code in MODULES.items():
+        module = code.rsplit("import ", 1)[1]
+        total, children = min(
+            (import_times(code, module) for _ in range(ROUNDS)), key=lambda run: run[0]
+        )
+        print(f"\n{label:>14} {total / 1000:>8.2f}ms")
+        for cumulative, name in sorted(children, reverse=True)[:TOP]:
+            print(f"{'':>14} {cumulative / 1000:>8.2f}ms  {name}")
+
+
+def spawn_to_initialize() -> float:
+    begin = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "mcp_server.py"), "--schema-cache", ""],
+        cwd=ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    process.stdin.write(json.dumps(INITIALIZE) + "\n")
+    process.stdin.flush()
+    response = process.stdout.readline()
+    elapsed = time.perf_counter() - begin
+    process.stdin.close()
+    process.wait()
+    assert json.loads(response)["id"] == 0, response
+    return elapsed
+
+
+def main():
+    bench_imports()
+    runs = [spawn_to_initialize() for _ in range(ROUNDS)]
+    print(f"\nspawn -> initialize response, best of {ROUNDS}: {min(runs) * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
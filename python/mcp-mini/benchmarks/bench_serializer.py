@@ -0,0 +1,96 @@
+"""Micro-benchmark: per-response encode cost of the JSON-RPC serializers.
+
+Encodes the responses the server produces most often (initialize,
+tools/list, tools/call, errors) with every available serializer, checks the
+output is byte-identical to the pydantic path and prints the cost per
+response.
+
+    uv run python benchmarks/bench_serializer.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dto import (  # noqa: E402
+    CallToolJSONRPCResult,
+    InitializeJSONRPCResult,
+    ListToolsJSONRPCResult,
+    TextToolContent,
+    ToolDefinition,
+    ToolInputSchema,
+    ToolParameterProperty,
+)
+from serializer import get_serializer  # noqa: E402
+
+N = 20_000
+
+
+def make_tools(count: int) -> list[ToolDefinition]:
+    return [
+        ToolDefinition(
+            name=f"tool_{i}",
+            description=f"Tool number {i}",
+            inputSchema=ToolInputSchema(
+                properties={
+                    "location": ToolParameterProperty(
+                        type="string", description="The location"
+                    )
+                },
+                required=["location"],
+            ),
+        )
+        for i in range(count)
+    ]
+
+
+def cases():
+    tools = make_tools(20)
+    return {
+        "initialize": lambda: InitializeJSONRPCResult(id=None),
+        "tools/list (20 tools)": lambda: ListToolsJSONRPCResult(id=None, tools=tools),
+        "tools/call": lambda: CallToolJSONRPCResult(
+            id=None, content=[TextToolContent(text="The weather of Beijing is sunny, 25°C")]
+        ),
+        "dict result": lambda: {"prompts": []},
+    }
+
+
+def main():
+    names = ["pydantic", "json"]
+    try:
+        import orjson  # noqa: F401
+
+        names.append("orjson")
+    except ImportError:
+        print("orjson not installed, skipping")
+
+    serializers = {name: get_serializer(name) for name in names}
+    reference = serializers["pydantic"]
+
+    for label, factory in cases().items():
+        # 先构造好响应对象，只统计编码耗时
+        results = [factory() for _ in range(N)]
+        expected = reference.encode_result(1, factory())
+        print(f"\n{label}")
+        for name, serializer in serializers.items():
+            assert serializer.encode_result(1, factory()) == expected, name
+            start = time.perf_counter()
+            for i, result in enumerate(results):
+                serializer.encode_result(i, result)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<10} {elapsed / N * 1e6:8.2f} us/response")
+
+    print("\nerror response")
+    for name, serializer in serializers.items():
+        start = time.perf_counter()
+        for i in range(N):
+            serializer.encode_error(i, -32601, "Method not found")
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<10} {elapsed / N * 1e6:8.2f} us/response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark: tools/call throughput as the number of concurrent sessions grows.
+
+Every session has its own ServerSession and calls get_weather through
+McpServer.call_tool concurrently. All sessions share one ShardedStore; the
+run is repeated with a single shard (one global lock) and with 16 shards.
+
+    uv run python benchmarks/bench_sessions.py
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_server import McpServer, ServerSession  # noqa: E402
+from request_context import current_session  # noqa: E402
+from session_store import ShardedStore  # noqa: E402
+
+CALLS_PER_SESSION = 2_000
+LOCATIONS = ["Beijing", "Shanghai", "Hangzhou", "NYC", "London", "Paris", "Tokyo"]
+
+
+async def run_session(server: McpServer, session: ServerSession) -> None:
+    current_session.set(session)
+    for i in range(CALLS_PER_SESSION):
+        await server.call_tool(
+            "get_weather", {"location": LOCATIONS[i % len(LOCATIONS)]}
+        )
+
+
+async def bench(sessions: int, shards: int) -> float:
+    store = ShardedStore(shards=shards)
+    prototype = ServerSession(None, shared=store)
+    server = McpServer(tools=[prototype.get_weather], max_workers=8)
+    try:
+        clients = [ServerSession(None, shared=store) for _ in range(sessions)]
+        start = time.perf_counter()
+        await asyncio.gather(*(run_session(server, client) for client in clients))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.close()
+
+    total = sessions * CALLS_PER_SESSION
+    # 每个会话只看到自己的记录
+    assert all(len(client.records) == CALLS_PER_SESSION for client in clients)
+    assert sum(v for _, v in store.items("weather:lookups:")) == total
+    return total / elapsed
+
+
+async def main():
+    logging.disable(logging.CRITICAL)
+    print(f"{'sessions':>8} {'1 shard':>14} {'16 shards':>14}")
+    for sessions in (1, 2, 4, 8, 16, 32):
+        single = await bench(sessions, 1)
+        sharded = await bench(sessions, 16)
+        print(f"{sessions:>8} {single:>10,.0f}/s {sharded:>10,.0f}/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
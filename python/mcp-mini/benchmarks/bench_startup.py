@@ -0,0 +1,92 @@
+"""Benchmark: McpServer startup with 500 tools, with and without the schema cache.
+
+A module with 500 documented tools is generated in a temp directory. Each
+run builds a fresh McpServer and serves the first tools/list page, which is
+when tool definitions are generated (or loaded from the schema cache).
+
+- no cache:   every definition is generated from docstrings and annotations
+- cold cache: definitions are generated and written to the cache file
+- warm cache: definitions are read from the cache file, as on every later start
+
+    uv run python benchmarks/bench_startup.py
+"""
+
+import importlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_server import McpServer  # noqa: E402
+from schema_cache import ToolSchemaCache  # noqa: E402
+
+TOOLS = 500
+ROUNDS = 20
+
+TOOL_SOURCE = '''
+@tool(description="Synthetic tool {i}", required_arguments=["query"])
+def tool_{i}(query: str, limit: int = 10, exact: bool = False, tags: list[str] = None) -> str:
+    """
+    Synthetic tool {i} used by the startup benchmark
+    Args:
+        query (str, required): The text to look up in data set {i}
+        limit (int, optional): Maximum number of results to return
+        exact (bool, optional): Only return exact matches
+        tags (list[str], optional): Restrict the lookup to these tags
+    Returns:
+        The matching entries
+    """
+    return query
+'''
+
+
+def generate_tools(directory: str) -> list:
+    path = os.path.join(directory, "bench_startup_tools.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("from tool_registry import tool\n")
+        for i in range(TOOLS):
+            f.write(TOOL_SOURCE.format(i=i))
+    sys.path.insert(0, directory)
+    module = importlib.import_module("bench_startup_tools")
+    return [getattr(module, f"tool_{i}") for i in range(TOOLS)]
+
+
+def start(tools: list, cache_path: str | None) -> tuple[float, float]:
+    """Return (construct seconds, construct + first tools/list seconds)"""
+    begin = time.perf_counter()
+    cache = ToolSchemaCache(cache_path) if cache_path else None
+    server = McpServer(tools=tools, page_size=100, schema_cache=cache)
+    constructed = time.perf_counter()
+    server.list_tools()
+    listed = time.perf_counter()
+    server.close()
+    return constructed - begin, listed - begin
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as directory:
+        tools = generate_tools(directory)
+        cache_path = os.path.join(directory, "schemas.json")
+
+        results = {"no cache": [], "cold cache": [], "warm cache": []}
+        for _ in range(ROUNDS):
+            results["no cache"].append(start(tools, None))
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+            results["cold cache"].append(start(tools, cache_path))
+            results["warm cache"].append(start(tools, cache_path))
+
+    print(f"{TOOLS} tools, best of {ROUNDS}")
+    print(f"{'':>12} {'__init__':>12} {'+ tools/list':>14}")
+    for name, runs in results.items():
+        construct = min(run[0] for run in runs)
+        total = min(run[1] for run in runs)
+        print(f"{name:>12} {construct * 1000:>10.2f}ms {total * 1000:>12.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
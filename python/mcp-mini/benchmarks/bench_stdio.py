@@ -0,0 +1,142 @@
+"""Benchmark: stdio throughput of mcp_server.py in async mode.
+
+A server process is spawned for each framing. All requests are written to
+its stdin at once and the responses are read back, so responses that are
+ready together can be coalesced into one write.
+
+- small: N pipelined tools/list requests (the page is cached, so this
+  mostly measures reading, dispatch and writing)
+- large: one resources/read of a LARGE_SIZE text file in a single chunk
+
+Before timing, check_resync() verifies that a Content-Length frame with a bad
+header does not break the frames after it.
+
+    uv run python benchmarks/bench_stdio.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+N = 10_000
+ROUNDS = 3
+LARGE_SIZE = 32 * 1024 * 1024
+
+
+def frame(message: dict, framing: str) -> bytes:
+    body = json.dumps(message).encode("utf-8")
+    if framing == "content-length":
+        return b"Content-Length: %d\r\n\r\n" % len(body) + body
+    return body + b"\n"
+
+
+def count_messages(output: bytes, framing: str) -> int:
+    if framing == "line":
+        return output.count(b"\n")
+    count = 0
+    position = 0
+    while position < len(output):
+        end = output.index(b"\r\n\r\n", position)
+        length = int(output[position:end].split(b":")[1])
+        position = end + 4 + length
+        count += 1
+    return count
+
+
+def run(framing: str, requests: list[dict], extra_args: list[str]) -> float:
+    payload = b"".join(frame(request, framing) for request in requests)
+    begin = time.perf_counter()
+    completed = subprocess.run(
+        [
+            sys.executable,
+            os.path.join(ROOT, "mcp_server.py"),
+            "--mode", "async",
+            "--framing", framing,
+            "--log-level", "warning",
+            "--schema-cache", "",
+            "--max-queue", str(len(requests)),
+            *extra_args,
+        ],
+        input=payload,
+        capture_output=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - begin
+    answered = count_messages(completed.stdout, framing)
+    # initialize 之外每个请求一条响应，另有 resources/list_changed 等通知时会更多
+    assert answered >= len(requests), (framing, answered)
+    return elapsed
+
+
+def check_resync() -> None:
+    """A frame with a bad header gets a parse error, the frame after it is still served"""
+    body = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/list", "params": {}})
+    bad = b"Content-Type: application/json\r\n\r\n" + body.encode("utf-8")
+    good = frame(
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/list", "params": {}}, "content-length"
+    )
+    for mode in ("sync", "async"):
+        completed = subprocess.run(
+            [
+                sys.executable,
+                os.path.join(ROOT, "mcp_server.py"),
+                "--mode", mode,
+                "--framing", "content-length",
+                "--schema-cache", "",
+            ],
+            input=bad + good,
+            capture_output=True,
+            check=True,
+        )
+        output = completed.stdout
+        assert count_messages(output, "content-length") == 2, (mode, output[:200])
+        assert b'"code":-32700' in output and b'"id":2' in output, (mode, output[:200])
+
+
+def main():
+    check_resync()
+    initialize = {
+        "jsonrpc": "2.0",
+        "id": 0,
+        "method": "initialize",
+        "params": {"protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {}},
+    }
+    small = [initialize] + [
+        {"jsonrpc": "2.0", "id": i, "method": "tools/list", "params": {}}
+        for i in range(1, N + 1)
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "large.log")
+        line = b"0123456789abcdef" * 7 + b"\n"
+        with open(path, "wb") as f:
+            f.write(line * (LARGE_SIZE // len(line)))
+        large = [
+            initialize,
+            {
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "resources/read",
+                "params": {"uri": f"file://{path}"},
+            },
+        ]
+        large_args = ["--resource", path, "--resource-chunk-size", str(LARGE_SIZE)]
+
+        print(f"best of {ROUNDS}")
+        for framing in ("line", "content-length"):
+            small_best = min(run(framing, small, []) for _ in range(ROUNDS))
+            large_best = min(run(framing, large, large_args) for _ in range(ROUNDS))
+            print(
+                f"{framing:>15}  {N} x tools/list {small_best * 1000:>8.1f}ms"
+                f" ({N / small_best:>8.0f} req/s)"
+                f"   {LARGE_SIZE >> 20}MiB resources/read {large_best * 1000:>8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
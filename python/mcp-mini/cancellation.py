@@ -0,0 +1,37 @@
+"""Request cancellation
+
+客户端发送 `notifications/cancelled`（params.requestId）后，JsonRPCServer 找到仍在处理的
+请求并取消它，不再写出它的响应：
+
+- async 工具和方法所在的 task 被 cancel，在下一个 await 处停止
+- 线程池中的同步工具无法被强行中断，取消标志会被 set，工具可以在循环中调用
+  `is_cancelled()` 提前退出；生成器工具在两个 chunk 之间自动停止
+- 还没开始执行的线程池 / 进程池任务直接从队列中移除
+
+只有 async 模式和 HTTP 传输能在请求处理期间读到取消通知，sync 模式逐行串行处理。
+"""
+
+import asyncio
+import threading
+
+from request_context import current_cancel_event
+
+
+class InFlightRequest:
+    """A request that is being processed and may still be cancelled"""
+
+    __slots__ = ("task", "cancelled")
+
+    def __init__(self, task: asyncio.Task, cancelled: threading.Event):
+        self.task: asyncio.Task = task
+        self.cancelled: threading.Event = cancelled
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+        self.task.cancel()
+
+
+def is_cancelled() -> bool:
+    """Whether the client cancelled the request the current tool is running for"""
+    event = current_cancel_event.get()
+    return event is not None and event.is_set()
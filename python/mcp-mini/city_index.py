@@ -0,0 +1,103 @@
+"""Location index for get_weather
+
+天气数据来自 JSON 数据文件（默认 weather_data.json），格式：
+
+    {"locations": [{"name": "Beijing", "aliases": ["Peking", "北京"], "report": "..."}]}
+
+名称和别名统一做 casefold 并合并空白后放进一个 dict，精确查找是 O(1)。
+查不到时用三元组（trigram）倒排索引找拼写相近的名称作为建议，只需要遍历
+查询串本身的几个三元组对应的倒排列表，不需要和每个地点逐一比较。
+"""
+
+import functools
+import json
+import os
+from collections import Counter
+from typing import Any
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_data.json")
+
+
+def normalize(name: str) -> str:
+    return " ".join(name.casefold().split())
+
+
+def trigrams(text: str) -> set[str]:
+    # 两端补空格，短名称和首尾字母也能产生三元组
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class Location:
+    __slots__ = ("name", "aliases", "report")
+
+    def __init__(self, name: str, aliases: list[str], report: str):
+        self.name: str = name
+        self.aliases: list[str] = aliases
+        self.report: str = report
+
+
+class CityIndex:
+    """Case-folded name/alias lookup with trigram fuzzy suggestions"""
+
+    def __init__(self, locations: list[Location]):
+        self.locations: list[Location] = locations
+        # 归一化后的名称或别名 -> Location
+        self._by_name: dict[str, Location] = {}
+        # 三元组 -> 含有它的名称（归一化后）
+        self._postings: dict[str, list[str]] = {}
+        self._trigram_counts: dict[str, int] = {}
+
+        for location in locations:
+            for name in (location.name, *location.aliases):
+                key = normalize(name)
+                if not key or key in self._by_name:
+                    continue
+                self._by_name[key] = location
+                grams = trigrams(key)
+                self._trigram_counts[key] = len(grams)
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(key)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_DATASET) -> "CityIndex":
+        with open(path, encoding="utf-8") as f:
+            data: dict[str, Any] = json.load(f)
+        return cls(
+            [
+                Location(item["name"], item.get("aliases", []), item["report"])
+                for item in data["locations"]
+            ]
+        )
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def lookup(self, name: str) -> Location | None:
+        return self._by_name.get(normalize(name))
+
+    def suggest(self, name: str, limit: int = 3, min_similarity: float = 0.3) -> list[str]:
+        """Canonical names of the locations most similar to name, best first"""
+        key = normalize(name)
+        grams = trigrams(key)
+        shared: Counter[str] = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        # Jaccard 相似度，多个别名命中同一地点时取最高分
+        best: dict[str, float] = {}
+        for candidate, count in shared.items():
+            score = count / (len(grams) + self._trigram_counts[candidate] - count)
+            if score < min_similarity:
+                continue
+            canonical = self._by_name[candidate].name
+            if score > best.get(canonical, 0.0):
+                best[canonical] = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+        return [canonical for canonical, _ in ranked[:limit]]
+
+
+@functools.lru_cache(maxsize=1)
+def default_city_index() -> CityIndex:
+    """The index of DEFAULT_DATASET, loaded on first use and shared by all sessions"""
+    return CityIndex.load()
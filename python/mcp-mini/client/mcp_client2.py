@@ -205,15 +205,25 @@ DEFAULT_SYSTEM_PROMPT = """
     - humidity：湿度
     - wind：风速
 
-- list_get_weather_records：返回查询过的所有的天气记录
-  输入参数：无
+- get_weather_batch：一次返回多个城市的天气信息，询问多个城市时优先使用
+  输入参数：
+    - locations：城市名称列表
+  输出：
+    - 每个城市对应的天气信息
+
+- list_get_weather_records：分页返回查询过的天气记录（offset、limit），aggregate=true 时返回每个地点的查询次数
+  输入参数（均可省略）：
+    - offset：从第几条记录开始返回，最早的记录为 0，默认 0，不能为负数
+    - limit：最多返回的记录数，默认 100，不能为负数
+    - aggregate：为 true 时返回每个地点的查询次数，而不是记录本身，默认 false
   输出：
-    - weather_records：天气记录
-      - city：城市名称
-      - weather：天气信息
-      - temperature：温度
-      - humidity：湿度
-      - wind：风速
+    - total：查询过的总次数
+    - available：还能读取的记录数（只保留最近的记录）
+    - aggregate=false 时：
+      - offset：本页第一条记录的位置
+      - records：本页查询过的地点名称列表，按查询时间从早到晚
+    - aggregate=true 时：
+      - counts：还能读取的记录中每个地点的查询次数
 """
 
 
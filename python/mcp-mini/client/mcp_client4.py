@@ -20,6 +20,8 @@ from dto import (
     ToolDefinition,
     CallToolJSONRPCRequest,
     CallToolJSONRPCResult,
+    JSONRPCRequest,
+    JSONRPCResult,
 )
 
 load_dotenv()
@@ -32,184 +34,9 @@ LLM_URL = "https://api.deepseek.com/chat/completions"
 LLM_MODEL = "deepseek-chat"
 MAX_ROUNDS = 10  # 最多保存10轮对话
 
-BASE_SYSTEM_PROMPT = """
-你是D-Cline，是一个优秀的Agent，你精通软件工程，精通各种编程语言、框架、设计模式以及代码的最佳实践。
-
-===
-你有一系列的工具可以使用，你每个消息可以使用一个工具，并且会接收到用户响应调用工具的结果，在调用工具前，你必须 thinking step by step。
-
-# 输出格式要求
-
-你的回复必须严格遵循以下 XML 格式：
-
-**第一步：思考过程**
-首先，你必须使用 `<thinking></thinking>` 标签包裹你的思考过程，格式如下：
-
-<thinking>
-[在这里详细说明你的思考过程，包括：
-- 分析用户的需求
-- 确定需要使用的工具
-- 说明为什么选择这个工具
-- 准备工具调用所需的参数]
-</thinking>
-
-**第二步：工具调用或最终答案**
-在思考过程之后，你可以选择：
-1. 调用工具获取更多信息
-2. 使用 final_answer 工具返回最终答案
-
-**重要**：
-1. 思考过程必须使用 `<thinking></thinking>` 标签包裹
-2. 思考过程和工具调用必须分开展示，先思考后调用
-3. 所有 XML 标签必须正确闭合
-4. 当你已经收集到足够的信息可以回答用户问题时，必须使用 final_answer 工具
-
-# 工具使用格式
-
-工具调用使用 XML 格式，XML 格式必须和下面一致。
-
-<tool_name>
-<parameter1_name>value1</parameter1_name>
-<parameter2_name>value2</parameter2_name>
-...
-</tool_name>
-
-样例1：
-<read_file>
-<path>src/main.js</path>
-<task_progress>Checklist here (optional)</task_progress>
-</read_file>
-
-样例2：
-<final_answer>
-<answer>这是我的最终答案，已经完成了用户的所有要求。</answer>
-</final_answer>
-
-# Tools
-你将有以下工具可以调用
-
-## ls
-描述：列出目录内容
-参数：
-- path：目录路径
-使用：
-
-<ls>
-<path>目录路径</path>
-</ls>
-
-## read_file
-描述：读取文件内容
-参数：
-- path：文件路径
-- task_progress：任务进度（可选）
-使用：
-
-<read_file>
-<path>文件路径</path>
-<task_progress>任务进度（可选）</task_progress>
-</read_file>
-
-## append_file
-描述：追加文件内容
-参数：
-- path：文件路径
-- content：文件内容
-使用：
-
-<append_file>
-<path>文件路径</path>
-<content>文件内容</content>
-</append_file>
-
-## delete_file
-描述：删除文件
-参数：
-- path：文件路径
-使用：
-
-<delete_file>
-<path>文件路径</path>
-</delete_file>
-
-## final_answer
-描述：当你已经完成任务或收集到足够信息回答用户问题时，使用此工具返回最终答案
-参数：
-- answer：你的最终答案内容
-使用：
-
-<final_answer>
-<answer>你的最终答案</answer>
-</final_answer>
-
-**重要**: 当你完成了用户的任务或者已经有足够的信息回答用户问题时，你必须调用 final_answer 工具。不要重复调用其他工具。
-
-# 使用 MCP tool
-描述：请求使用由连接的 MCP 服务器提供的工具。每个 MCP 服务器可以提供多个具有不同功能的工具。工具具有定义的输入模式，用于指定必需和可选参数。
-参数：
-- server_name: (必需) 提供工具的 MCP 服务器名称
-- tool_name: (必需) 要执行的工具名称
-- arguments: (必需) 包含工具输入参数的 JSON 对象，遵循工具的输入模式
-用法：
-
-<use_mcp_tool>
-<server_name>server name here</server_name>
-<tool_name>tool name here</tool_name>
-<arguments>
-{
-  "param1": "value1",
-  "param2": "value2"
-}
-</arguments>
-</use_mcp_tool>
-
-完整输出格式示例（包含思考过程和工具调用）：
-
-<thinking>
-用户询问 redis 查询 key user:token。我需要使用 redis-server 的 get_value 工具来获取值。
-</thinking>
-
-<use_mcp_tool>
-<server_name>redis-server</server_name>
-<tool_name>get_value</tool_name>
-<arguments>
-{
-  "key": "user:token"
-}
-</arguments>
-</use_mcp_tool>
-
-使用 MCP Tool 样例1：
-<use_mcp_tool>
-<server_name>redis-server</server_name>
-<tool_name>get_value</tool_name>
-<arguments>
-{
-  "key": "user:token"
-}
-</arguments>
-</use_mcp_tool>
-
-
-使用 MCP Tool 样例2：
-<use_mcp_tool>
-<server_name>github.com/modelcontextprotocol/servers/tree/main/src/github</server_name>
-<tool_name>create_issue</tool_name>
-<arguments>
-{
-  "owner": "octocat",
-  "repo": "hello-world",
-  "title": "Found a bug",
-  "body": "I'm having a problem with this.",
-  "labels": ["bug", "help wanted"],
-  "assignees": ["octocat"]
-}
-</arguments>
-</use_mcp_tool>
-===
-# MCP Server
-{MCP_SERVERS_SECTION}
-"""
+# system prompt 由 MCP Server 以 prompt 模板提供（prompts/d_cline_system.md），
+# 客户端通过 prompts/get 获取，不再保留一份副本
+SYSTEM_PROMPT_NAME = "d_cline_system"
 
 
 class MCPClient:
@@ -296,15 +123,19 @@ class MCPClient:
         await self.list_tools()
 
     async def list_tools(self):
-        """获取工具列表"""
-        list_request = ListToolsJSONRPCRequest(id="list_tools")
-        request_json = list_request.to_json() + "\n"
-        self.process.stdin.write(request_json.encode("utf-8"))
-        await self.process.stdin.drain()
-
-        # 读取响应
-        response_line_bytes = await self.process.stdout.readline()
-        if response_line_bytes:
+        """获取工具列表，服务器分页时按 nextCursor 逐页获取"""
+        self.tools = []
+        cursor = None
+        while True:
+            list_request = ListToolsJSONRPCRequest(id="list_tools", cursor=cursor)
+            request_json = list_request.to_json() + "\n"
+            self.process.stdin.write(request_json.encode("utf-8"))
+            await self.process.stdin.drain()
+
+            # 读取响应
+            response_line_bytes = await self.process.stdout.readline()
+            if not response_line_bytes:
+                break
             try:
                 response_line = response_line_bytes.decode("utf-8").strip()
             except UnicodeDecodeError:
@@ -315,9 +146,16 @@ class MCPClient:
             list_response = ListToolsJSONRPCResult.from_json(response_line)
             if list_response.is_error:
                 raise Exception(f"List tools failed: {list_response.error}")
-            if list_response.result and "tools" in list_response.result:
-                tools_data = list_response.result["tools"]
-                self.tools = [ToolDefinition(**tool) for tool in tools_data]
+            if not list_response.result or "tools" not in list_response.result:
+                break
+
+            # 每收到一页就追加，不必等全部页返回
+            tools_data = list_response.result["tools"]
+            self.tools.extend(ToolDefinition(**tool) for tool in tools_data)
+
+            cursor = list_response.result.get("nextCursor")
+            if not cursor:
+                break
 
     async def call_tool(
         self, tool_name: str, arguments: dict[str, Any] | None = None
@@ -351,6 +189,31 @@ class MCPClient:
                 return "\n".join(texts)
         return ""
 
+    async def get_prompt(
+        self, name: str, arguments: dict[str, Any] | None = None
+    ) -> str | None:
+        """通过 prompts/get 获取 prompt 模板渲染后的文本，服务器没有该 prompt 时返回 None"""
+        request = JSONRPCRequest(
+            method="prompts/get", params={"name": name, "arguments": arguments or {}}
+        )
+        self.process.stdin.write((request.to_json() + "\n").encode("utf-8"))
+        await self.process.stdin.drain()
+
+        response_line_bytes = await self.process.stdout.readline()
+        if not response_line_bytes:
+            return None
+        response = JSONRPCResult.from_json(
+            response_line_bytes.decode("utf-8", errors="replace").strip()
+        )
+        if response.is_error or not response.result:
+            return None
+        texts = []
+        for message in response.result.get("messages", []):
+            content = message.get("content", {})
+            if content.get("type") == "text":
+                texts.append(content.get("text", ""))
+        return "\n".join(texts)
+
     async def close(self):
         """关闭连接"""
         if self.process:
@@ -446,11 +309,18 @@ async def initialize_mcp_servers(config_path: str) -> dict[str, MCPClient]:
     return mcp_clients
 
 
-def build_system_prompt(mcp_clients: dict[str, MCPClient]) -> str:
-    """动态构建 system prompt"""
+async def build_system_prompt(mcp_clients: dict[str, MCPClient]) -> str:
+    """动态构建 system prompt，模板从提供了它的 MCP Server 获取"""
     mcp_servers_section = build_mcp_servers_section(mcp_clients)
     print(f"注入的 MCP Server 及其工具：\n{mcp_servers_section}")
-    return BASE_SYSTEM_PROMPT.replace("{MCP_SERVERS_SECTION}", mcp_servers_section)
+    arguments = {"mcp_servers_section": mcp_servers_section}
+    for client in mcp_clients.values():
+        system_prompt = await client.get_prompt(SYSTEM_PROMPT_NAME, arguments)
+        if system_prompt is not None:
+            return system_prompt
+    raise RuntimeError(
+        f"没有 MCP 服务器提供 prompt '{SYSTEM_PROMPT_NAME}'，请检查 mcp.json 中的 fake-weather-server"
+    )
 
 
 class ChatBot:
@@ -734,7 +604,7 @@ async def main():
     mcp_clients = await initialize_mcp_servers(str(config_path))
 
     # 动态构建 system prompt
-    system_prompt = build_system_prompt(mcp_clients)
+    system_prompt = await build_system_prompt(mcp_clients)
 
     print(f"{'='*50}")
     print("MCP 客户端已就绪，开始交互式对话")
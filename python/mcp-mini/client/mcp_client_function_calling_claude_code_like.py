@@ -274,32 +274,42 @@ class MCPClient:
                 continue
 
     async def list_tools(self):
-        """获取工具列表"""
-        list_request = ListToolsJSONRPCRequest(id="list_tools")
-        request_json = list_request.to_json() + "\n"
-        self.process.stdin.write(request_json.encode("utf-8"))
-        await self.process.stdin.drain()
+        """获取工具列表，服务器分页时按 nextCursor 逐页获取"""
+        tools: list[ToolDefinition] = []
+        cursor = None
+        while True:
+            list_request = ListToolsJSONRPCRequest(id="list_tools", cursor=cursor)
+            request_json = list_request.to_json() + "\n"
+            self.process.stdin.write(request_json.encode("utf-8"))
+            await self.process.stdin.drain()
 
-        response = await self._read_response(expected_id="list_tools")
-        if not response:
-            print(f"  [{self.server_name}] 警告: list_tools 响应为空")
-            return
+            response = await self._read_response(expected_id="list_tools")
+            if not response:
+                print(f"  [{self.server_name}] 警告: list_tools 响应为空")
+                return
 
-        try:
-            list_response = ListToolsJSONRPCResult.model_validate(response)
-        except Exception as e:
-            print(f"  [{self.server_name}] 解析 list_tools 响应失败: {e}")
-            print(f"  [{self.server_name}] 原始响应: {str(response)[:200]}")
-            return
+            try:
+                list_response = ListToolsJSONRPCResult.model_validate(response)
+            except Exception as e:
+                print(f"  [{self.server_name}] 解析 list_tools 响应失败: {e}")
+                print(f"  [{self.server_name}] 原始响应: {str(response)[:200]}")
+                return
+
+            if list_response.is_error:
+                raise Exception(f"List tools failed: {list_response.error}")
+            if list_response.result and "tools" in list_response.result:
+                # 每收到一页就更新工具列表，不必等全部页返回
+                tools_data = list_response.result["tools"]
+                tools.extend(ToolDefinition(**tool) for tool in tools_data)
+                self.tools = tools
+            else:
+                print(f"  [{self.server_name}] 响应中没有 tools 字段")
+                print(f"  [{self.server_name}] result 内容: {list_response.result}")
+                return
 
-        if list_response.is_error:
-            raise Exception(f"List tools failed: {list_response.error}")
-        if list_response.result and "tools" in list_response.result:
-            tools_data = list_response.result["tools"]
-            self.tools = [ToolDefinition(**tool) for tool in tools_data]
-        else:
-            print(f"  [{self.server_name}] 响应中没有 tools 字段")
-            print(f"  [{self.server_name}] result 内容: {list_response.result}")
+            cursor = list_response.result.get("nextCursor")
+            if not cursor:
+                return
 
     async def call_tool(
         self, tool_name: str, arguments: dict[str, Any] | None = None
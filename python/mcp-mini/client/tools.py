@@ -3,14 +3,12 @@
 工具函数使用 @tool 装饰器定义，格式遵循 Google-style docstrings。
 """
 
-import httpx
-from markdownify import markdownify as md
 import subprocess
 import glob as glob_lib
 from typing import Any, Union, get_type_hints, get_origin, get_args, Callable
 import inspect
 import re
-from mcp_server import tool
+from tool_registry import tool
 
 
 # ============== Docstring 解析工具函数 ==============
@@ -301,6 +299,10 @@ async def fetch_to_markdown(url: str) -> str:
     Returns:
         网页内容的 Markdown 格式字符串
     """
+    # httpx 和 markdownify 导入较慢，只有真正抓取网页时才需要
+    import httpx
+    from markdownify import markdownify as md
+
     try:
         async with httpx.AsyncClient(timeout=30.0) as client:
             response = await client.get(
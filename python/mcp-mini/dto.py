@@ -111,7 +111,13 @@ class InitializeJSONRPCRequest(JSONRPCRequest):
 class InitializeJSONRPCResult(JSONRPCResult):
     """Initialize JSON RPC Result"""
 
-    def __init__(self, id: str | int | None = None, is_error: bool = False, **data):
+    def __init__(
+        self,
+        id: str | int | None = None,
+        is_error: bool = False,
+        capabilities: Capabilities | None = None,
+        **data,
+    ):
         # 如果 result 已经在 data 中（从 JSON 解析），直接使用父类初始化
         if "result" in data or "error" in data:
             super().__init__(id=id, **data)
@@ -121,14 +127,15 @@ class InitializeJSONRPCResult(JSONRPCResult):
                 result = None
                 error = JSONRPCError(code=-1, message="Initialize error")
             else:
-                capabilities = Capabilities(
-                    tools={"listChanged": True},
-                    logging={"listChanged": False},
-                    prompts={"listChanged": False},
-                    resources={"subscribe": False, "listChanged": False},
-                    completions={"listChanged": False},
-                    experimental={"listChanged": False},
-                )
+                if capabilities is None:
+                    capabilities = Capabilities(
+                        tools={"listChanged": True},
+                        logging={"listChanged": False},
+                        prompts={"listChanged": False},
+                        resources={"subscribe": False, "listChanged": False},
+                        completions={"listChanged": False},
+                        experimental={"listChanged": False},
+                    )
                 result = {
                     "protocolVersion": "2024-11-05",
                     "capabilities": capabilities.model_dump(exclude_none=True),
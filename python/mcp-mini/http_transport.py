@@ -0,0 +1,324 @@
+"""HTTP transport for JsonRPCServer
+
+基于标准库 asyncio 的精简版 MCP Streamable HTTP 传输，一个服务进程即可服务多个客户端：
+
+- POST /mcp      请求体是一条 JSON-RPC 消息或批量请求，响应体是对应的 JSON 响应；
+                 只有通知时返回 202
+- GET  /mcp      Accept: text/event-stream 时打开 SSE 流，接收服务端 -> 客户端的消息
+- DELETE /mcp    结束 Mcp-Session-Id 对应的会话
+
+连接支持 HTTP/1.1 keep-alive，不同连接上的请求并发处理。每个会话有自己的
+ServerSession：没有携带 Mcp-Session-Id 的连接会得到一个新会话，会话 id 通过
+Mcp-Session-Id 响应头返回，客户端带上它即可在其他连接（例如 SSE 流）上复用同一会话。
+会话在 DELETE 或长时间空闲后释放。
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Callable
+
+from request_context import current_notifier, current_session
+
+if TYPE_CHECKING:
+    from mcp_server import JsonRPCServer
+
+logger = logging.getLogger(__name__)
+
+MCP_PATH = "/mcp"
+MAX_BODY_SIZE = 16 * 1024 * 1024
+KEEP_ALIVE_TIMEOUT = 60.0
+SSE_PING_INTERVAL = 15.0
+# 超过这个时间没有请求、也没有 SSE 流的会话会被清理
+SESSION_IDLE_TIMEOUT = 30 * 60.0
+
+_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    406: "Not Acceptable",
+    411: "Length Required",
+    413: "Payload Too Large",
+}
+
+
+class HttpSession:
+    """State of one MCP session: its ServerSession and open SSE streams"""
+
+    def __init__(self, session_id: str, server_session: Any):
+        self.id: str = session_id
+        self.server_session: Any = server_session
+        self.streams: set[asyncio.Queue[str]] = set()
+        self.last_seen: float = time.monotonic()
+
+    def close(self) -> None:
+        if self.server_session is not None:
+            self.server_session.close()
+
+    def publish(self, message: str) -> None:
+        for stream in self.streams:
+            stream.put_nowait(message)
+
+
+class HttpTransport:
+    """Serve a JsonRPCServer over HTTP with keep-alive and optional SSE"""
+
+    def __init__(
+        self,
+        server: "JsonRPCServer",
+        session_factory: Callable[[], Any] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+    ):
+        self.server: "JsonRPCServer" = server
+        self.session_factory: Callable[[], Any] | None = session_factory
+        self.host: str = host
+        self.port: int = port
+        self.sessions: dict[str, HttpSession] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def serve_forever(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.server.install_executor(self._loop)
+        # 没有会话上下文的通知（例如工具列表变化）广播给所有 SSE 流
+        self.server.default_notifier = self._broadcast
+
+        tcp_server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        logger.info(f"HTTP transport listening on http://{self.host}:{self.port}{MCP_PATH}")
+        async with tcp_server:
+            await tcp_server.serve_forever()
+
+    def _broadcast(self, message: str) -> None:
+        self._call_in_loop(self._publish_all, message)
+
+    def _publish_all(self, message: str) -> None:
+        for session in self.sessions.values():
+            session.publish(message)
+
+    def _session_notifier(self, session: HttpSession) -> Callable[[str], None]:
+        def notify(message: str) -> None:
+            self._call_in_loop(session.publish, message)
+
+        return notify
+
+    def _call_in_loop(self, func: Callable[[str], None], message: str) -> None:
+        # 通知可能来自工具线程，统一切回事件循环线程操作队列
+        self._loop.call_soon_threadsafe(func, message)
+
+    def _new_session(self) -> HttpSession:
+        self._expire_sessions()
+        server_session = self.session_factory() if self.session_factory else None
+        session = HttpSession(uuid.uuid4().hex, server_session)
+        self.sessions[session.id] = session
+        logger.info(f"HTTP session {session.id} created")
+        return session
+
+    def _expire_sessions(self) -> None:
+        deadline = time.monotonic() - SESSION_IDLE_TIMEOUT
+        expired = [
+            session_id
+            for session_id, session in self.sessions.items()
+            if session.last_seen < deadline and not session.streams
+        ]
+        for session_id in expired:
+            self.sessions.pop(session_id).close()
+            logger.info(f"HTTP session {session_id} expired")
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        peer = writer.get_extra_info("peername")
+        # 没有携带 Mcp-Session-Id 的请求使用这个连接自己的会话
+        connection_session: HttpSession | None = None
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(
+                        self._read_request(reader), KEEP_ALIVE_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body, keep_alive = request
+                if path.split("?", 1)[0] != MCP_PATH:
+                    await self._respond(writer, 404, b"", keep_alive)
+                    if not keep_alive:
+                        break
+                    continue
+
+                session_id = headers.get("mcp-session-id")
+                if session_id is not None:
+                    session = self.sessions.get(session_id)
+                    if session is None:
+                        await self._respond(writer, 404, b"", keep_alive)
+                        if not keep_alive:
+                            break
+                        continue
+                elif method == "POST":
+                    if connection_session is None:
+                        connection_session = self._new_session()
+                    session = connection_session
+                else:
+                    session = None
+                if session is not None:
+                    session.last_seen = time.monotonic()
+
+                if method == "POST":
+                    await self._handle_post(writer, session, body, keep_alive)
+                elif method == "GET":
+                    if session is None:
+                        await self._respond(writer, 400, b"", keep_alive)
+                    elif "text/event-stream" not in headers.get("accept", ""):
+                        await self._respond(writer, 406, b"", keep_alive)
+                    else:
+                        # SSE 流会一直占用这个连接，直到客户端断开
+                        await self._stream_events(writer, session)
+                        break
+                elif method == "DELETE":
+                    if session is None:
+                        await self._respond(writer, 400, b"", keep_alive)
+                    else:
+                        self.sessions.pop(session.id, None)
+                        session.close()
+                        logger.info(f"HTTP session {session.id} closed")
+                        await self._respond(writer, 200, b"", keep_alive)
+                else:
+                    await self._respond(
+                        writer, 405, b"", keep_alive, {"Allow": "GET, POST, DELETE"}
+                    )
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except _BadRequest as e:
+            logger.info(f"Bad HTTP request from {peer}: {e}")
+            await self._respond(writer, e.status, b"", False)
+        except Exception as e:
+            logger.error(f"Unexpected error on HTTP connection {peer}: {e}", exc_info=True)
+        finally:
+            writer.close()
+
+    async def _handle_post(
+        self,
+        writer: asyncio.StreamWriter,
+        session: HttpSession,
+        body: bytes,
+        keep_alive: bool,
+    ) -> None:
+        # 并发上限和排队由 server.admission 控制，过载时返回 JSON-RPC 错误
+        current_session.set(session.server_session)
+        current_notifier.set(self._session_notifier(session))
+        response = await self.server.process_line_async(
+            body.decode("utf-8", errors="replace")
+        )
+
+        headers = {"Mcp-Session-Id": session.id}
+        if response is None:
+            await self._respond(writer, 202, b"", keep_alive, headers)
+        else:
+            headers["Content-Type"] = "application/json"
+            await self._respond(
+                writer, 200, response.encode("utf-8"), keep_alive, headers
+            )
+
+    async def _stream_events(
+        self, writer: asyncio.StreamWriter, session: HttpSession
+    ) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n"
+            + f"Mcp-Session-Id: {session.id}\r\n\r\n".encode("ascii")
+        )
+        await writer.drain()
+
+        stream: asyncio.Queue[str] = asyncio.Queue()
+        session.streams.add(stream)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(stream.get(), SSE_PING_INTERVAL)
+                except asyncio.TimeoutError:
+                    # 定期发送注释行，既能保活也能发现已断开的连接
+                    writer.write(b": ping\n\n")
+                else:
+                    writer.write(f"event: message\ndata: {message}\n\n".encode("utf-8"))
+                await writer.drain()
+        finally:
+            session.streams.discard(stream)
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> tuple[str, str, dict[str, str], bytes, bool] | None:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        try:
+            method, path, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise _BadRequest(400, f"malformed request line {request_line!r}")
+
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+
+        body = b""
+        if method == "POST":
+            if "chunked" in headers.get("transfer-encoding", "").lower():
+                raise _BadRequest(411, "chunked request bodies are not supported")
+            if "content-length" not in headers:
+                raise _BadRequest(411, "missing Content-Length")
+            try:
+                length = int(headers["content-length"])
+            except ValueError:
+                raise _BadRequest(400, "invalid Content-Length")
+            if length < 0:
+                raise _BadRequest(400, "invalid Content-Length")
+            if length > MAX_BODY_SIZE:
+                raise _BadRequest(413, f"body of {length} bytes is too large")
+            body = await reader.readexactly(length)
+
+        return method.upper(), path, headers, body, keep_alive
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        body: bytes,
+        keep_alive: bool,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        lines.append(f"Content-Length: {len(body)}")
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        writer.write(head + body)
+        await writer.drain()
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status: int = status
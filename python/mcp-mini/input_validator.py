@@ -0,0 +1,218 @@
+"""Argument validation for tools/call
+
+McpServer 在调用工具前用工具的 inputSchema 检查 arguments，不合法的调用直接返回
+-32602，工具本身不会被执行。schema 在第一次调用时被编译成嵌套的检查函数：类型检查
+是一次 `type(value) in frozenset` 查找，required / enum 等都预先算好，调用时不再
+解析 schema。一次遍历收集全部错误，LLM 可以在一次重试中全部改正。
+
+支持的关键字（JSON Schema 的子集）：type（字符串或列表）、enum、minimum / maximum /
+exclusiveMinimum / exclusiveMaximum、properties、required、additionalProperties
+（布尔值）、items、anyOf / oneOf / allOf。
+其它关键字被忽略。和 JSON Schema 一样，bool 不算 integer / number。
+"""
+
+from typing import Any, Callable
+
+# 检查函数：(value, path, errors)，把错误描述追加到 errors
+Check = Callable[[Any, str, list[str]], None]
+
+JSON_TYPES: dict[str, tuple[type, ...]] = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list, tuple),
+    "object": (dict,),
+    "null": (type(None),),
+}
+
+_TYPE_NAMES: dict[type, str] = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    tuple: "array",
+    dict: "object",
+    type(None): "null",
+}
+
+
+def json_type_name(value: Any) -> str:
+    return _TYPE_NAMES.get(type(value), type(value).__name__)
+
+
+def compile_validator(schema: dict[str, Any]) -> Callable[[dict[str, Any]], list[str]]:
+    """
+    Compile an object schema into a function that returns the errors for a value
+
+    Args:
+        schema (dict): the inputSchema of a tool
+
+    Returns:
+        a function taking the arguments dict, returning error messages (empty when valid)
+    """
+    check = _compile(schema)
+
+    def validate(arguments: dict[str, Any]) -> list[str]:
+        errors: list[str] = []
+        check(arguments, "", errors)
+        return errors
+
+    return validate
+
+
+def _compile(schema: dict[str, Any]) -> Check:
+    checks: list[Check] = []
+
+    declared = schema.get("type")
+    if declared is not None:
+        checks.append(_compile_type(declared))
+    if "enum" in schema:
+        checks.append(_compile_enum(schema["enum"]))
+    bounds = [(keyword, schema[keyword]) for keyword in _BOUNDS if keyword in schema]
+    if bounds:
+        checks.append(_compile_bounds(bounds))
+    if (
+        "properties" in schema
+        or "required" in schema
+        or schema.get("additionalProperties") is False
+    ):
+        checks.append(_compile_object(schema))
+    if "items" in schema and isinstance(schema["items"], dict):
+        checks.append(_compile_items(schema["items"]))
+    for keyword in ("anyOf", "oneOf"):
+        if schema.get(keyword):
+            checks.append(_compile_any_of([_compile(branch) for branch in schema[keyword]]))
+    for branch in schema.get("allOf") or ():
+        checks.append(_compile(branch))
+
+    if not checks:
+        return _accept
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value: Any, path: str, errors: list[str]) -> None:
+        for check in checks:
+            failed = len(errors)
+            check(value, path, errors)
+            if len(errors) > failed:
+                # 类型不对时不再报告 enum、属性等后续错误
+                return
+
+    return check_all
+
+
+def _accept(value: Any, path: str, errors: list[str]) -> None:
+    pass
+
+
+def _compile_type(declared: str | list[str]) -> Check:
+    names = [declared] if isinstance(declared, str) else list(declared)
+    allowed = frozenset(t for name in names for t in JSON_TYPES.get(name, ()))
+    if not allowed:
+        # 不认识的类型不做检查
+        return _accept
+    # bool 是 int 的子类，但这里按 type() 精确匹配，True 不会被当成 integer
+    expected = " or ".join(names)
+
+    def check_type(value: Any, path: str, errors: list[str]) -> None:
+        if type(value) not in allowed:
+            errors.append(f"{path or 'arguments'}: expected {expected}, got {json_type_name(value)}")
+
+    return check_type
+
+
+def _compile_enum(options: list[Any]) -> Check:
+    # 带上类型比较，避免 True == 1、1 == 1.0 这类匹配
+    hashable = frozenset((type(option), option) for option in options if _is_hashable(option))
+    unhashable = [option for option in options if not _is_hashable(option)]
+    described = ", ".join(repr(option) for option in options)
+
+    def check_enum(value: Any, path: str, errors: list[str]) -> None:
+        if _is_hashable(value):
+            if (type(value), value) in hashable:
+                return
+        elif value in unhashable:
+            return
+        errors.append(f"{path or 'arguments'}: must be one of {described}, got {value!r}")
+
+    return check_enum
+
+
+# 关键字 -> (比较函数, 错误信息中的运算符)
+_BOUNDS: dict[str, tuple[Callable[[Any, Any], bool], str]] = {
+    "minimum": (lambda value, bound: value >= bound, ">="),
+    "maximum": (lambda value, bound: value <= bound, "<="),
+    "exclusiveMinimum": (lambda value, bound: value > bound, ">"),
+    "exclusiveMaximum": (lambda value, bound: value < bound, "<"),
+}
+
+
+def _compile_bounds(bounds: list[tuple[str, Any]]) -> Check:
+    limits = [(*_BOUNDS[keyword], bound) for keyword, bound in bounds]
+
+    def check_bounds(value: Any, path: str, errors: list[str]) -> None:
+        if type(value) not in (int, float):
+            return  # 只约束数字，bool 和其它类型由 type 检查报告
+        for compare, operator, bound in limits:
+            if not compare(value, bound):
+                errors.append(f"{path or 'arguments'}: must be {operator} {bound}, got {value!r}")
+
+    return check_bounds
+
+
+def _is_hashable(value: Any) -> bool:
+    return not isinstance(value, (list, dict))
+
+
+def _compile_object(schema: dict[str, Any]) -> Check:
+    properties = [
+        (name, _compile(property_schema))
+        for name, property_schema in (schema.get("properties") or {}).items()
+    ]
+    required = tuple(schema.get("required") or ())
+    known = frozenset(schema.get("properties") or ())
+    closed = schema.get("additionalProperties") is False
+
+    def check_object(value: Any, path: str, errors: list[str]) -> None:
+        if type(value) is not dict:
+            return  # 类型错误由 type 检查报告
+        prefix = f"{path}." if path else ""
+        for name in required:
+            if name not in value:
+                errors.append(f"{prefix}{name}: missing required argument")
+        for name, check in properties:
+            if name in value:
+                check(value[name], prefix + name, errors)
+        if closed:
+            for name in sorted(value.keys() - known):
+                errors.append(f"{prefix}{name}: unexpected argument")
+
+    return check_object
+
+
+def _compile_items(items_schema: dict[str, Any]) -> Check:
+    check_item = _compile(items_schema)
+    if check_item is _accept:
+        return _accept
+
+    def check_items(value: Any, path: str, errors: list[str]) -> None:
+        if type(value) not in (list, tuple):
+            return
+        for index, item in enumerate(value):
+            check_item(item, f"{path}[{index}]", errors)
+
+    return check_items
+
+
+def _compile_any_of(branches: list[Check]) -> Check:
+    def check_any_of(value: Any, path: str, errors: list[str]) -> None:
+        for branch in branches:
+            branch_errors: list[str] = []
+            branch(value, path, branch_errors)
+            if not branch_errors:
+                return
+        errors.append(f"{path or 'arguments'}: does not match any of the allowed schemas")
+
+    return check_any_of
@@ -0,0 +1,132 @@
+"""Logging pipeline for the server
+
+- sync:  日志记录在调用线程中直接格式化并写文件（原始行为）
+- async: 调用线程只把 LogRecord 放进队列，由后台线程格式化并写文件，
+         请求处理路径上没有磁盘 I/O，也不做字符串格式化
+
+两种模式都支持：
+- 运行时调整级别（`set_level`，MCP 的 logging/setLevel 也会用到）
+- 按消息模板采样：DEBUG/INFO 级别的同一条模板每 N 条只保留 1 条，WARNING 及以上全部保留
+- 截断过长的消息（例如完整的请求行、工具结果）
+"""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    A QueueHandler that does not format in the calling thread.
+
+    The stock QueueHandler.prepare merges msg and args before enqueueing; here
+    the record is passed through untouched and formatted by the listener
+    thread. Only a traceback is rendered eagerly, since its frames may change.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one of every `every` DEBUG/INFO records per message template"""
+
+    MAX_TEMPLATES = 10_000
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        if not 0 < rate <= 1:
+            raise ValueError("sample rate must be in (0, 1]")
+        self.every: int = max(1, round(1 / rate))
+        self._counts: dict[tuple[str, object], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno >= logging.WARNING:
+            return True
+        # 模板来自 f-string 时每条都不同，防止计数表无限增长
+        if len(self._counts) >= self.MAX_TEMPLATES:
+            self._counts.clear()
+        key = (record.name, record.msg)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class TruncatingFormatter(logging.Formatter):
+    """Cut the message part of a record to at most max_length characters"""
+
+    def __init__(self, fmt: str = LOG_FORMAT, max_length: int | None = None):
+        super().__init__(fmt)
+        self.max_length: int | None = max_length
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        if self.max_length is not None and len(record.message) > self.max_length:
+            dropped = len(record.message) - self.max_length
+            record.message = (
+                f"{record.message[: self.max_length]}... [{dropped} chars truncated]"
+            )
+        return super().formatMessage(record)
+
+
+class LoggingPipeline:
+    """Owns the root logger's handlers for the server process"""
+
+    def __init__(
+        self,
+        log_file: str,
+        level: int | str = logging.DEBUG,
+        mode: str = "sync",
+        sample_rate: float = 1.0,
+        max_message_length: int | None = None,
+    ):
+        if mode not in ("sync", "async"):
+            raise ValueError(f"Unknown logging mode: {mode}")
+        self.log_file: str = log_file
+        self.level: int | str = level
+        self.mode: str = mode
+        self.sample_rate: float = sample_rate
+        self.max_message_length: int | None = max_message_length
+        self._listener: QueueListener | None = None
+
+    def start(self) -> "LoggingPipeline":
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+
+        file_handler = logging.FileHandler(self.log_file, encoding="utf-8")
+        file_handler.setFormatter(TruncatingFormatter(max_length=self.max_message_length))
+
+        if self.mode == "async":
+            records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+            handler: logging.Handler = LazyQueueHandler(records)
+            self._listener = QueueListener(records, file_handler)
+            self._listener.start()
+            atexit.register(self.stop)
+        else:
+            handler = file_handler
+
+        # 采样在调用线程中进行，被丢弃的记录不会进入队列
+        if self.sample_rate < 1:
+            handler.addFilter(SamplingFilter(self.sample_rate))
+
+        root.addHandler(handler)
+        root.setLevel(self.level)
+        return self
+
+    def stop(self) -> None:
+        """Flush queued records, safe to call more than once"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def set_level(self, level: int | str) -> None:
+        logging.getLogger().setLevel(level)
+        self.level = level
@@ -3,105 +3,164 @@ import json
 import signal
 import os
 import argparse
-from typing import Any
-from dto import (
-    JSONRPCResult,
-    JSONRPCError,
-    ToolInputSchema,
-    ToolDefinition,
-    ToolParameterProperty,
-    ListToolsJSONRPCResult,
-    CallToolJSONRPCResult,
-    TextToolContent,
-    InitializeJSONRPCResult,
+import asyncio
+import base64
+import bisect
+import contextvars
+import functools
+import threading
+import time
+import types
+import typing
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+from serializer import EncodedResult, PydanticSerializer, get_serializer
+from tool_registry import SimpleTool, Tool, tool
+from request_context import (
+    current_cancel_event,
+    current_notifier,
+    current_progress,
+    current_session,
 )
+from cancellation import InFlightRequest
+from admission import OVERLOADED_ERROR, AdmissionController, AdmissionRejected
+from stdio_transport import FramingError, StdioReader, StdioWriter
+from progress import ProgressReporter, collect, collect_async
+from session_store import ShardedStore
+from record_store import RecordStore
+from resources import DEFAULT_CHUNK_SIZE, FileResource, ResourceRangeError
+from prompt_templates import PromptArgumentError, PromptLibrary
+from schema_cache import ToolSchemaCache, tool_schema_key
+from input_validator import compile_validator
+from city_index import (
+    DEFAULT_DATASET,
+    CityIndex,
+    default_city_index,
+    normalize as normalize_location,
+)
+from log_pipeline import LoggingPipeline
+from metrics import MetricsFileWriter, MetricsRegistry
 import logging
 import inspect
 
 # from collections.abc import Callable
 from typing import Callable
 
-# 在 Windows 上强制使用 UTF-8 编码
-if sys.platform == "win32":
-    # 重新配置 stdout 和 stdin 为 UTF-8
-    if hasattr(sys.stdout, "reconfigure"):
-        sys.stdout.reconfigure(encoding="utf-8", errors="replace")
-    if hasattr(sys.stdin, "reconfigure"):
-        sys.stdin.reconfigure(encoding="utf-8", errors="replace")
-
-
-api_key = os.getenv("FAKE_CLINE_WEATHER_API_KEY", "test-key-123")
+if TYPE_CHECKING:
+    # dto 依赖 pydantic（导入约 0.1 秒），运行时在第一次用到时才导入
+    from dto import (
+        CallToolJSONRPCResult,
+        Capabilities,
+        InitializeJSONRPCResult,
+        ToolDefinition,
+    )
+    from process_pool import ProcessToolPool
+    from tool_cache import ToolCache
 
 # 获取脚本所在目录
 script_dir = os.path.dirname(os.path.abspath(__file__))
 log_file = os.path.join(script_dir, "mcp_server.log")
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler(log_file, encoding="utf-8")],
-)
 logger = logging.getLogger(__name__)
 
-logger.info(f"api_key: {api_key}")
 
+class JsonRPCException(Exception):
+    """Raised by a registered method to answer with a specific JSON-RPC error"""
 
-class Tool:
-    def __init__(
-        self,
-        name: str,
-        arguments: dict[str, Any],
-        description: str,
-        required_arguments: list[str],
-        func: Callable[..., Any],
-    ):
-        self.name: str = name
-        self.arguments: dict[str, Any] = arguments
-        self.description: str = description
-        self.required_arguments: list[str] = required_arguments
-        self.func: Callable[..., Any] = func
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code: int = code
+        self.message: str = message
 
 
-class SimpleTool:
-    def __init__(
-        self,
-        name: str,
-        arguments: dict[str, Any],
-        description: str,
-        required_arguments: list[str],
-        func: callable,
-    ):
+class MethodBinder:
+    """
+    Precompiled call path for a registered JSON-RPC method.
+
+    The signature is inspected once at registration time. Dispatch then only
+    checks the incoming parameter names against a frozenset and calls the
+    function, dropping parameters the method does not accept.
+    """
+
+    def __init__(self, name: str, func: Callable[..., Any]):
         self.name: str = name
-        self.arguments: dict[str, Any] = arguments
-        self.description: str = description
-        self.required_arguments: list[str] = required_arguments
-        self.func: callable = func
-
-
-def tool(
-    name: str | None = None,
-    description: str | None = None,
-    required_arguments: list[str] | None = None,
-) -> Callable[[callable], SimpleTool]:
-    if required_arguments is None:
-        required_arguments = []
-
-    def decorator(func):
-        return SimpleTool(
-            name=name or func.__name__,
-            description=description or inspect.getdoc(func) or "",
-            arguments=func.__annotations__,
-            required_arguments=required_arguments,
-            func=func,
+        self.func: Callable[..., Any] = func
+        # async def 方法在事件循环中直接 await，同步方法放到线程池执行
+        self.is_async: bool = inspect.iscoroutinefunction(func)
+
+        parameters = inspect.signature(func).parameters.values()
+        self.accepts_var_kwargs: bool = any(
+            p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters
+        )
+        self.accepted_params: frozenset[str] = frozenset(
+            p.name
+            for p in parameters
+            if p.kind
+            in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
         )
 
-    return decorator
+    def __call__(self, params: dict[str, Any]) -> Any:
+        # 常见情况：没有参数、函数接受 **kwargs 或者参数全部被接受
+        if (
+            not params
+            or self.accepts_var_kwargs
+            or params.keys() <= self.accepted_params
+        ):
+            return self.func(**params)
+
+        filtered_params = {}
+        extra_params = []
+        for key, value in params.items():
+            if key in self.accepted_params:
+                filtered_params[key] = value
+            else:
+                extra_params.append(key)
+
+        logger.info("Filtered parameters for %s: %s", self.name, extra_params)
+        return self.func(**filtered_params)
 
 
 class JsonRPCServer:
-    def __init__(self):
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        serializer: PydanticSerializer | None = None,
+        metrics: MetricsRegistry | None = None,
+        max_queue: int = 64,
+        tool_limits: dict[str, int] | None = None,
+        max_queue_wait: float | None = None,
+        framing: str = "line",
+    ):
         self.methods: dict[str, callable] = {}
+        self._binders: dict[str, MethodBinder] = {}
+        # 不经过准入控制的方法（例如读取统计），过载时也能立即响应
+        self._unlimited: set[str] = set()
         self.running: bool = True
+        # stdio 的分帧方式："line" 每行一条消息，"content-length" 为 LSP 风格的长度前缀
+        self.framing: str = framing
+        # stdout 可能被多个线程写入（响应、通知），StdioWriter 保证消息完整并合并写入
+        self._stdout: StdioWriter | None = None
+        # 没有 current_notifier 时服务端通知的出口，stdio 模式下写到 stdout
+        self.default_notifier: Callable[[str], None] = self._write_message
+        # 同步模式下用来执行 async 方法的事件循环，首次需要时创建
+        self._sync_loop: asyncio.AbstractEventLoop | None = None
+        # 响应编码方式，安装了 orjson 时默认使用绕过 pydantic 的快速路径
+        self.serializer: PydanticSerializer = serializer or get_serializer("auto")
+        # 异步模式下同时处理的最大请求数
+        self.max_in_flight: int = max_in_flight
+        # 异步模式下的全局/按工具并发上限和等待队列，过载时返回 OVERLOADED_ERROR
+        self.admission = AdmissionController(
+            max_in_flight=max_in_flight,
+            max_queue=max_queue,
+            tool_limits=tool_limits,
+            max_queue_wait=max_queue_wait,
+        )
+        # 每个方法的调用次数、错误数和耗时，为 None 时不统计
+        self.metrics: MetricsRegistry | None = metrics
+        # 正在处理的请求，按 (会话, 请求 id) 索引，用于响应 notifications/cancelled
+        self._in_flight: dict[tuple[Any, str | int], InFlightRequest] = {}
+        self.register_method("notifications/cancelled", self.cancel_request)
         # 处理终止信号
         if sys.platform != "win32":
             _ = signal.signal(signal.SIGTERM, self._handle_signal)
@@ -112,8 +171,22 @@ class JsonRPCServer:
         logger.info(f"Server received signal {signal_num}, shutting down")
         sys.exit(0)
 
-    def register_method(self, name: str, method: callable):
+    def register_method(self, name: str, method: callable, admission: bool = True):
+        """
+        Register a JSON-RPC method
+
+        Args:
+            name (str): method name
+            method (callable): handler, sync or async
+            admission (bool, optional): False lets the method bypass admission control
+        """
         self.methods[name] = method
+        # 注册时一次性解析签名，请求处理时只需查表调用
+        self._binders[name] = MethodBinder(name, method)
+        if admission:
+            self._unlimited.discard(name)
+        else:
+            self._unlimited.add(name)
 
     def process_request(self, request: dict[str, Any]) -> str | None:
         """
@@ -129,127 +202,440 @@ class JsonRPCServer:
             return self._error_response(request.get("id"), -32600, "Invalid Request")
 
         method = request.get("method")
-        params: dict[str, Any] = request.get("params", {})
+        params: dict[str, Any] = request.get("params") or {}
         request_id = request.get("id")
 
         # 如果没有id，这是一个通知
         if request_id is None:
-            logger.info(f"Received notification: {method}, do nothing")
-            # For notifications, we still process but don't send response
-            if method in self.methods:
-                try:
-                    # 获取方法签名并过滤参数
-                    func = self.methods[method]
-                    sig = inspect.signature(func)
-                    filtered_params = {}
-
-                    for key, value in params.items():
-                        if key in sig.parameters:
-                            filtered_params[key] = value
-                        else:
-                            logger.debug(
-                                f"Filtering out parameter '{key}' for method '{method}'"
-                            )
-
-                    func(**filtered_params)
-                except Exception as e:
-                    logger.error(f"Error processing notification {method}: {str(e)}")
+            self._process_notification(method, params)
             return None
 
         # 处理请求
-        logger.info(f"Processing request for method: {method}, id: {request_id}")
-        if method not in self.methods:
-            logger.error(f"Method not found: {method}")
+        logger.info("Processing request for method: %s, id: %s", method, request_id)
+        if method not in self._binders:
+            logger.error("Method not found: %s", method)
             return self._error_response(request_id, -32601, "Method not found")
 
+        started = time.perf_counter()
+        failed = True
         try:
-            func = self.methods[method]
-
-            # 智能参数过滤：只传递函数实际接受的参数
-            sig = inspect.signature(func)
-            filtered_params = {}
-            extra_params = {}
-
-            for key, value in params.items():
-                if key in sig.parameters:
-                    filtered_params[key] = value
-                elif "**" in str(sig):  # 如果函数有 **kwargs
-                    filtered_params[key] = value
-                else:
-                    extra_params[key] = value
-                    logger.debug(
-                        f"Parameter '{key}' not accepted by method '{method}', filtering out"
-                    )
-
-            if extra_params:
-                logger.info(
-                    f"Filtered parameters for {method}: {list(extra_params.keys())}"
-                )
+            result = self._invoke(method, params)
+            if inspect.isawaitable(result):
+                result = self._run_sync(result)
+            response = self._result_response(request_id, result)
+            failed = False
+            return response
+        except JsonRPCException as e:
+            logger.info("Method %s answered with error %s: %s", method, e.code, e.message)
+            return self._error_response(request_id, e.code, e.message)
+        except Exception as e:
+            logger.error(
+                f"Internal error processing method {method}: {str(e)}", exc_info=True
+            )
+            return self._error_response(request_id, -32603, f"Internal error: {str(e)}")
+        finally:
+            self._observe(method, started, failed)
 
-            result = func(**filtered_params)
+    async def process_request_async(self, request: dict[str, Any]) -> str | None:
+        """
+        Process a json rpc request without blocking the event loop.
 
-            # Check if result is already a JSONRPCResult object
-            if isinstance(result, JSONRPCResult):
-                result.id = request_id
-                return result.to_json()
-            else:
-                return JSONRPCResult(id=request_id, result=result).to_json()
+        The method itself runs on the loop's default executor, so a slow
+        handler only occupies one worker thread while other requests proceed.
+        It first has to be admitted by `admission`; when the server is
+        overloaded the request fails right away with OVERLOADED_ERROR.
+
+        Args:
+            request (dict): json rpc request
+
+        Returns:
+            str: json rpc response
+        """
+        if request.get("jsonrpc") != "2.0":
+            return self._error_response(request.get("id"), -32600, "Invalid Request")
+
+        method = request.get("method")
+        params: dict[str, Any] = request.get("params") or {}
+        request_id = request.get("id")
 
+        # 通知按到达顺序同步处理，保证 notifications 的先后关系
+        if request_id is None:
+            self._process_notification(method, params)
+            return None
+
+        logger.info("Processing request for method: %s, id: %s", method, request_id)
+        if method not in self._binders:
+            logger.error("Method not found: %s", method)
+            return self._error_response(request_id, -32601, "Method not found")
+
+        started = time.perf_counter()
+        failed = True
+        # 在单独的 task 中执行，notifications/cancelled 只取消这一个请求
+        cancelled = threading.Event()
+        work = asyncio.ensure_future(self._dispatch_async(method, params, cancelled))
+        in_flight = self._track(request_id, InFlightRequest(work, cancelled))
+        try:
+            result = await work
+            if in_flight is not None and in_flight.cancelled.is_set():
+                logger.info("Request %s was cancelled, dropping its response", request_id)
+                return None
+            response = self._result_response(request_id, result)
+            failed = False
+            return response
+        except asyncio.CancelledError:
+            if in_flight is not None and in_flight.cancelled.is_set():
+                logger.info("Request %s cancelled by the client", request_id)
+                return None
+            work.cancel()
+            raise
+        except AdmissionRejected as e:
+            logger.warning("Request %s for %s rejected: %s", request_id, method, e)
+            return self._error_response(request_id, OVERLOADED_ERROR, str(e))
+        except JsonRPCException as e:
+            logger.info("Method %s answered with error %s: %s", method, e.code, e.message)
+            return self._error_response(request_id, e.code, e.message)
         except Exception as e:
             logger.error(
                 f"Internal error processing method {method}: {str(e)}", exc_info=True
             )
             return self._error_response(request_id, -32603, f"Internal error: {str(e)}")
+        finally:
+            self._untrack(request_id, in_flight)
+            self._observe(method, started, failed)
+
+    async def _dispatch_async(
+        self, method: str, params: dict[str, Any], cancelled: threading.Event
+    ) -> Any:
+        current_cancel_event.set(cancelled)
+        # 同步模式下批量请求在 _sync_loop 中执行，一次只处理一条消息，不经过准入控制
+        if method in self._unlimited or asyncio.get_running_loop() is self._sync_loop:
+            return await self._execute(method, params)
+
+        # 排队也在这个 task 里，排队中的请求同样可以被 notifications/cancelled 取消
+        tool = None
+        if method == "tools/call" and isinstance(params, dict):
+            name = params.get("name")
+            tool = name if isinstance(name, str) else None
+        await self.admission.acquire(tool)
+        try:
+            return await self._execute(method, params)
+        finally:
+            self.admission.release(tool)
+
+    async def _execute(self, method: str, params: dict[str, Any]) -> Any:
+        if self._binders[method].is_async:
+            return await self._invoke(method, params)
+
+        loop = asyncio.get_running_loop()
+        # 复制 context，使 current_session 等在线程中同样可见
+        context = contextvars.copy_context()
+        result = await loop.run_in_executor(
+            None, context.run, self._invoke, method, params
+        )
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _track(
+        self, request_id: Any, in_flight: InFlightRequest
+    ) -> InFlightRequest | None:
+        if not isinstance(request_id, (str, int)):
+            return None
+        # HTTP 模式下不同会话的请求 id 可能相同
+        self._in_flight[(current_session.get(), request_id)] = in_flight
+        return in_flight
+
+    def _untrack(self, request_id: Any, in_flight: InFlightRequest | None) -> None:
+        if in_flight is None:
+            return
+        key = (current_session.get(), request_id)
+        if self._in_flight.get(key) is in_flight:
+            del self._in_flight[key]
+
+    async def admission_stats(self) -> dict[str, Any]:
+        """Handle admission/stats"""
+        # 在事件循环线程中执行，读取队列时它不会被同时修改
+        return self.admission.stats()
+
+    def cancel_request(self, requestId: str | int, reason: str | None = None) -> None:
+        """Handle notifications/cancelled"""
+        in_flight = self._in_flight.get((current_session.get(), requestId))
+        if in_flight is None:
+            # 请求已经完成，或者从未收到过
+            logger.info("Cancellation for unknown request %s ignored", requestId)
+            return
+        logger.info("Cancelling request %s: %s", requestId, reason)
+        in_flight.cancel()
+
+    async def process_batch_async(self, batch: list[Any]) -> str | None:
+        """
+        Process a json rpc batch request
+
+        All elements run concurrently. Notifications produce no entry, invalid
+        elements produce their own error entry, and the remaining responses are
+        combined into a single JSON array.
+
+        Args:
+            batch (list): json rpc batch request
+
+        Returns:
+            str: json rpc batch response, None if the batch only had notifications
+        """
+        if not batch:
+            return self._error_response(None, -32600, "Invalid Request")
+
+        logger.info("Processing batch of %d requests", len(batch))
+        responses = await asyncio.gather(
+            *(self._process_batch_item(item) for item in batch)
+        )
+        responses = [response for response in responses if response is not None]
+        if not responses:
+            return None
+        return "[" + ",".join(responses) + "]"
+
+    async def _process_batch_item(self, item: Any) -> str | None:
+        if not isinstance(item, dict):
+            return self._error_response(None, -32600, "Invalid Request")
+        return await self.process_request_async(item)
+
+    def _process_notification(self, method: str, params: dict[str, Any]) -> None:
+        logger.info("Received notification: %s", method)
+        # For notifications, we still process but don't send response
+        binder = self._binders.get(method)
+        if binder is not None:
+            try:
+                binder(params)
+            except Exception as e:
+                logger.error(f"Error processing notification {method}: {str(e)}")
+
+    async def process_line_async(self, line: str) -> str | None:
+        """
+        Process one raw json rpc message, a single request or a batch
+
+        Args:
+            line (str): the encoded message
+
+        Returns:
+            str: json rpc response, None if nothing has to be sent back
+        """
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            return self._error_response(None, -32700, "Parse error")
+        return await self.process_message_async(request)
+
+    async def process_message_async(self, request: Any) -> str | None:
+        """
+        Process one decoded json rpc message, a single request or a batch
+
+        Args:
+            request: the decoded message
+
+        Returns:
+            str: json rpc response, None if nothing has to be sent back
+        """
+        if isinstance(request, list):
+            return await self.process_batch_async(request)
+        if not isinstance(request, dict):
+            return self._error_response(None, -32600, "Invalid Request")
+        return await self.process_request_async(request)
+
+    def send_notification(self, method: str, params: dict[str, Any] | None = None):
+        """
+        Send a server-to-client notification
+
+        The message goes to the transport of the current request if there is
+        one (e.g. the SSE stream of an HTTP session), otherwise to
+        `default_notifier`. Safe to call from tool threads.
+        """
+        message: dict[str, Any] = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        notifier = current_notifier.get() or self.default_notifier
+        notifier(json.dumps(message, ensure_ascii=False, separators=(",", ":")))
+
+    @property
+    def stdout(self) -> StdioWriter:
+        if self._stdout is None:
+            self._stdout = StdioWriter(sys.stdout.buffer, self.framing)
+        return self._stdout
+
+    def _write_message(self, text: str) -> None:
+        self.stdout.write(text)
+
+    def install_executor(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Size the loop's default executor, which runs sync methods, to max_in_flight"""
+        loop.set_default_executor(
+            ThreadPoolExecutor(
+                max_workers=self.max_in_flight, thread_name_prefix="jsonrpc-worker"
+            )
+        )
+
+    def _invoke(self, method: str, params: dict[str, Any]) -> Any:
+        return self._binders[method](params)
+
+    def _observe(self, method: str, started: float, failed: bool) -> None:
+        if self.metrics is not None:
+            self.metrics.observe("method", method, time.perf_counter() - started, failed)
+
+    def _run_sync(self, awaitable: Any) -> Any:
+        """Run an awaitable to completion from the sync serving loop"""
+        if self._sync_loop is None:
+            self._sync_loop = asyncio.new_event_loop()
+        return self._sync_loop.run_until_complete(awaitable)
+
+    def _result_response(self, request_id: str | int, result: Any) -> str:
+        return self.serializer.encode_result(request_id, result)
 
     def _error_response(
         self, request_id: str | int | None, code: int, message: str
     ) -> str:
         """生成错误响应"""
-        return JSONRPCResult(
-            id=request_id, error=JSONRPCError(code=code, message=message)
-        ).to_json()
+        return self.serializer.encode_error(request_id, code, message)
 
     def start(self):
         """
         Start the server
         """
+        reader = StdioReader(sys.stdin.buffer, self.framing)
+        stdout = self.stdout
         while self.running:
             try:
-                # 从标准输入读取一行数据，如果没有，就一直等待
-                line = sys.stdin.readline()
-                if not line:
+                # 从标准输入读取一条消息，如果没有，就一直等待
+                line = reader.read_message()
+                if line is None:
                     break
 
-                line = line.strip()
-                if not line:
-                    continue
-
-                logger.debug(f"Received line: {line}")
+                logger.debug("Received message: %s", line)
                 request = json.loads(line)
-                response: str = self.process_request(request)
+                if isinstance(request, list):
+                    # 批量请求：批内并发执行，合并成一行响应
+                    response = self._run_sync(self.process_batch_async(request))
+                else:
+                    response = self.process_request(request)
 
                 if response is not None:
-                    response_line = response + "\n"
-                    sys.stdout.write(response_line)
-                    sys.stdout.flush()
-
-            except json.JSONDecodeError:
-                error = self._error_response(None, -32700, "Parse error")
-                sys.stdout.write(error + "\n")
-                sys.stdout.flush()
+                    stdout.write(response)
+
+            except (json.JSONDecodeError, FramingError) as e:
+                logger.info("Unreadable message: %s", e)
+                stdout.write(self._error_response(None, -32700, "Parse error"))
             except (EOFError, KeyboardInterrupt):
                 logger.info("Server interrupted")
                 break
             except Exception as e:
                 logger.error(f"Unexpected error: {e}", exc_info=True)
 
-        logger.info("Server shutting down")
+        logger.info(
+            "Server shutting down, %d messages in %d writes", stdout.messages, stdout.writes
+        )
+
+    async def start_async(self):
+        """
+        Start the server in concurrent mode.
+
+        Lines keep being read while earlier requests are still running, and
+        every response is written as soon as it is ready. Responses may
+        therefore arrive out of order; clients match them by id. Responses
+        that complete in the same event loop iteration go out in one write.
+        How many
+        requests run at once, and how many may wait, is decided by
+        `admission`; requests beyond that are answered with OVERLOADED_ERROR
+        instead of piling up.
+        """
+        loop = asyncio.get_running_loop()
+        self.install_executor(loop)
+        # stdin 的阻塞读取放在单独的线程里，不占用处理请求的线程
+        stdin_reader = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="stdin-reader"
+        )
+        reader = StdioReader(sys.stdin.buffer, self.framing)
+        stdout = self.stdout
+        tasks: set[asyncio.Task] = set()
+
+        try:
+            while self.running:
+                try:
+                    # 一次取回已经到达的全部消息，而不是每条消息切换一次线程
+                    lines = await loop.run_in_executor(stdin_reader, reader.read_messages)
+                except FramingError as e:
+                    logger.info("Unreadable message: %s", e)
+                    stdout.write_soon(self._error_response(None, -32700, "Parse error"), loop)
+                    continue
+                if lines is None:
+                    break
+
+                for line in lines:
+                    logger.debug("Received message: %s", line)
+                    try:
+                        request = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        logger.info("Unreadable message: %s", e)
+                        stdout.write_soon(self._error_response(None, -32700, "Parse error"), loop)
+                        continue
+                    # 取消通知立即处理，不等排在它前面的请求被调度；
+                    # 只处理单条通知，批量请求和带 id 的消息照常执行并写回响应
+                    if (
+                        isinstance(request, dict)
+                        and request.get("method") == "notifications/cancelled"
+                        and "id" not in request
+                    ):
+                        await self.process_message_async(request)
+                        continue
+                    task = asyncio.create_task(self._serve_message(request))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+            # stdin 关闭后，等待仍在处理中的请求写完响应
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            stdin_reader.shutdown(wait=False)
+            stdout.flush()
+
+        logger.info(
+            "Server shutting down, %d messages in %d writes", stdout.messages, stdout.writes
+        )
+
+    async def _serve_message(self, request: Any) -> None:
+        try:
+            response = await self.process_message_async(request)
+            if response is not None:
+                self.stdout.write_soon(response, asyncio.get_running_loop())
+        except Exception as e:
+            logger.error(f"Unexpected error: {e}", exc_info=True)
+
+
+# get_weather_batch 单次最多查询的地点数，以及通过 other_api 并发查询的上限
+MAX_BATCH_LOCATIONS = 50
+BATCH_CONCURRENCY = 8
 
 
 class ServerSession:
-    def __init__(self, other_api: Any):
+    """
+    Per-client state, one instance per connection or initialize call.
+
+    `records` belongs to this session only. Data that has to be visible to
+    every session goes into the optional `shared` store.
+    """
+
+    def __init__(
+        self,
+        other_api: Any,
+        shared: ShardedStore | None = None,
+        records: RecordStore | None = None,
+        cities: CityIndex | None = None,
+    ):
         self.other_api = other_api
-        self.records: list[str] = []
+        # 默认只在内存中保留最近的记录，传入带 log_path 的 RecordStore 可以保留全部历史
+        self.records: RecordStore = records if records is not None else RecordStore()
+        self.shared: ShardedStore | None = shared
+        # 地点数据只读，所有会话共用同一份索引
+        self.cities: CityIndex = cities if cities is not None else default_city_index()
+
+    def close(self) -> None:
+        """Close the records log of this session"""
+        self.records.close()
 
     @tool(description="Get the weather of a location", required_arguments=["location"])
     def get_weather(self, location: str) -> str:
@@ -260,91 +646,348 @@ class ServerSession:
         Returns:
             The weather of the location
         """
-        logger.info(f"get_weather called with location: {location}")
+        logger.info("get_weather called with location: %s", location)
         self.records.append(location)
 
         if location is None or location.strip() == "":
             return "Location is required"
 
         location = location.strip()
-        result = f"The weather of {location} is unspported, please try another location"
-
-        if location.lower() == "beijing":
-            result = "The weather of Beijing is sunny, 25°C"
-        elif location.lower() == "shanghai":
-            result = "The weather of Shanghai is cloudy, 22°C"
-        elif location.lower() == "hangzhou":
-            result = "The weather of Hangzhou is rainy, 29°C, 80% humidity, wind 10km/h"
-        elif location.lower() == "nyc":
-            result = """The weather of NYC is
-                        67°F°C
-                        Precipitation: 0%
-                        Humidity: 68%
-                        Wind: 6 mph
-                        """
-
-        logger.info(f"get_weather returning: {result}")
+        if self.shared is not None:
+            # 所有会话共享的按城市查询次数
+            self.shared.incr(f"weather:lookups:{location.lower()}")
+
+        if self.other_api is not None:
+            result = self.other_api.get_weather(location)
+        else:
+            result = self._lookup(location)
+
+        logger.info("get_weather returning: %s", result)
+        return result
+
+    @tool(
+        description="Get the weather of several locations in one call",
+        required_arguments=["locations"],
+    )
+    async def get_weather_batch(self, locations: list[str]) -> dict[str, str]:
+        """
+        Get the weather of several locations in one call
+        Args:
+            locations (list[str], required): The locations to get weather for, at most 50, like ["Beijing", "Shanghai"]
+        Returns:
+            The weather of every location, keyed by location
+        """
+        logger.info("get_weather_batch called with %d locations", len(locations))
+        if len(locations) > MAX_BATCH_LOCATIONS:
+            raise ValueError(f"at most {MAX_BATCH_LOCATIONS} locations per call")
+
+        # 同一地点的不同写法（大小写、空白）只查询一次
+        unique: dict[str, str] = {}
+        keys: list[str | None] = []
+        for location in locations:
+            self.records.append(location)
+            if location is None or location.strip() == "":
+                keys.append(None)
+                continue
+            location = location.strip()
+            key = normalize_location(location)
+            unique.setdefault(key, location)
+            keys.append(key)
+
+        if self.shared is not None:
+            for location in unique.values():
+                self.shared.incr(f"weather:lookups:{location.lower()}")
+
+        if self.other_api is not None:
+            # 外部接口按地点并发查询，同时进行的请求数有上限
+            limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+            async def fetch(location: str) -> str:
+                async with limit:
+                    return await asyncio.to_thread(self.other_api.get_weather, location)
+
+            results = await asyncio.gather(*(fetch(loc) for loc in unique.values()))
+            resolved = dict(zip(unique, results))
+        else:
+            resolved = {key: self._lookup(loc) for key, loc in unique.items()}
+
+        weather: dict[str, str] = {}
+        for location, key in zip(locations, keys):
+            weather[location] = "Location is required" if key is None else resolved[key]
+        return weather
+
+    def _lookup(self, location: str) -> str:
+        match = self.cities.lookup(location)
+        if match is not None:
+            result = match.report
+        else:
+            result = f"The weather of {location} is unspported, please try another location"
+            # 给出拼写相近的地点，省去一次重试
+            suggestions = self.cities.suggest(location)
+            if suggestions:
+                result += f". Did you mean: {', '.join(suggestions)}?"
         return result
 
-    @tool(description="List all get weather records")
-    def list_get_weather_records(self) -> list[str]:
-        logger.info(f"list_get_weather_records called, returning: {self.records}")
-        return self.records.copy()
+    @tool(
+        description="List get weather records, a page at a time or as counts per location",
+        argument_schemas={"offset": {"minimum": 0}, "limit": {"minimum": 0}},
+    )
+    def list_get_weather_records(
+        self, offset: int = 0, limit: int = 100, aggregate: bool = False
+    ) -> dict[str, Any]:
+        """
+        List get weather records
+        Args:
+            offset (int, optional): Index of the first record to return, oldest first, default 0
+            limit (int, optional): Maximum number of records to return, default 100
+            aggregate (bool, optional): Return the number of lookups per location, over the records still available, instead of the records
+        Returns:
+            A page of records, or the counts per location
+        """
+        logger.info(
+            "list_get_weather_records called, offset=%s limit=%s aggregate=%s",
+            offset,
+            limit,
+            aggregate,
+        )
+        if aggregate:
+            return {
+                "total": self.records.total,
+                "available": len(self.records),
+                "counts": self.records.counts(),
+            }
+        return {
+            "total": self.records.total,
+            "available": len(self.records),
+            "offset": offset,
+            "records": self.records.page(offset, limit),
+        }
 
 
 class McpServer:
-    def __init__(self, tools: list[SimpleTool], session: ServerSession = None):
-        # Convert SimpleTool to Tool objects
-        tool_objects: list[Tool] = []
-        for simple_tool in tools:
-            tool_obj: Tool = Tool(
-                name=simple_tool.name,
-                arguments=simple_tool.arguments,
-                description=simple_tool.description,
-                required_arguments=simple_tool.required_arguments,
-                func=simple_tool.func,
-            )
-            tool_objects.append(tool_obj)
-
-        # Convert Tool objects to ToolDefinition objects
-        tool_definitions: list[ToolDefinition] = []
-        for tool_obj in tool_objects:
-            # Parse docstring to get parameter descriptions
-            param_descriptions = self._parse_docstring_params(tool_obj.func)
-
-            # Convert function annotations to ToolParameterProperty objects
-            properties = {}
-            for param_name, param_type in tool_obj.arguments.items():
-                if param_name != "return":  # Skip return annotation
-                    # Use description from docstring if available, otherwise use default
-                    description = param_descriptions.get(
-                        param_name, f"Parameter {param_name}"
-                    )
-                    properties[param_name] = ToolParameterProperty(
-                        type=self._get_type_string(param_type),
-                        description=description,
-                    )
-
-            input_schema = ToolInputSchema(
-                type="object",
-                properties=properties,
-                required=(
-                    tool_obj.required_arguments if tool_obj.required_arguments else []
-                ),
-            )
+    def __init__(
+        self,
+        tools: list[SimpleTool],
+        session: ServerSession = None,
+        session_factory: Callable[[], ServerSession] | None = None,
+        page_size: int | None = 100,
+        max_workers: int = 8,
+        process_workers: int | None = None,
+        max_calls_per_worker: int | None = 100,
+        metrics: MetricsRegistry | None = None,
+        resources: list[FileResource] | None = None,
+        resource_chunk_size: int = DEFAULT_CHUNK_SIZE,
+        prompts: PromptLibrary | None = None,
+        schema_cache: ToolSchemaCache | None = None,
+    ):
+        # 按名称排序，保证分页顺序稳定
+        self._tool_objs: list[Tool] = []
+        # ToolDefinition 在第一次 tools/list 时才生成（或从 schema_cache 读取）
+        self._tool_definitions: "list[ToolDefinition] | None" = None
+        self._definitions_lock = threading.Lock()
+        self.schema_cache: ToolSchemaCache | None = schema_cache
+        # 按工具名缓存从 inputSchema 编译出的参数检查函数，第一次调用时编译
+        self._validators: dict[str, Callable[[dict[str, Any]], list[str]]] = {}
+        self._tool_names: list[str] = []
+        self.tool_funcs: dict[str, Callable[..., Any]] = {}
+        self.tool_execution: dict[str, str] = {}
+        self.tool_caches: "dict[str, ToolCache]" = {}
+        self.session = session
+        # 没有传入 session 时，第一次 initialize 用它创建 stdio 使用的 ServerSession
+        self.session_factory: Callable[[], ServerSession] | None = session_factory
+        # 服务端通知出口，通常设置为 JsonRPCServer.send_notification
+        self.notifier: Callable[[str, dict[str, Any] | None], None] | None = None
+        # 服务端自身的日志管道，logging/setLevel 通过它调整级别
+        self.log_pipeline: LoggingPipeline | None = None
+        # tools/list 每页的条数，None 表示不分页
+        if page_size is not None and page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        self.page_size: int | None = page_size
+        # tools/list 每页 result 编码后的缓存，按页起始位置索引，工具注册表变化时失效
+        self._tools_pages: dict[int, bytes] = {}
+        # 同步工具在这个线程池中执行，避免阻塞事件循环
+        self._tool_executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="mcp-tool"
+        )
+        # execution="process" 的工具在进程池中执行，有这类工具注册时才启动
+        self._process_workers: int | None = process_workers
+        self._max_calls_per_worker: int | None = max_calls_per_worker
+        self._process_pool: "ProcessToolPool | None" = None
+        # 每个工具的调用次数、错误数和耗时，为 None 时不统计
+        self.metrics: MetricsRegistry | None = metrics
+        # 按 uri 索引的 resource，以及 resources/read 单次返回的最大字节数
+        self.resources: dict[str, FileResource] = {
+            resource.uri: resource for resource in resources or []
+        }
+        self.resource_chunk_size: int = resource_chunk_size
+        # prompts/list 和 prompts/get 使用的模板，为 None 时没有 prompt
+        self.prompts: PromptLibrary | None = prompts
 
-            tool_def = ToolDefinition(
-                name=tool_obj.name,
-                description=tool_obj.description,
-                inputSchema=input_schema,
+        for simple_tool in tools:
+            self._register_tool(simple_tool)
+
+        logger.info(f"McpServer initialized with tools: {self._tool_names}")
+
+    def close(self) -> None:
+        """Release the tool thread pool, process pool and the stdio session"""
+        self._tool_executor.shutdown(wait=False, cancel_futures=True)
+        if self.schema_cache is not None:
+            # 首次生成之后通过 add_tool 注册的工具，在这里写入缓存文件
+            self.schema_cache.save()
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+        if self.prompts is not None:
+            self.prompts.stop()
+        if self.session is not None:
+            self.session.close()
+
+    def add_tool(self, simple_tool: SimpleTool) -> None:
+        """Register a tool, replacing any existing tool with the same name"""
+        self._unregister_tool(simple_tool.name)
+        self._register_tool(simple_tool)
+        logger.info(f"Tool '{simple_tool.name}' added")
+        self._notify("notifications/tools/list_changed")
+
+    def remove_tool(self, name: str) -> bool:
+        """Unregister a tool, returns False if there was no such tool"""
+        removed = self._unregister_tool(name)
+        if removed:
+            logger.info(f"Tool '{name}' removed")
+            self._notify("notifications/tools/list_changed")
+        return removed
+
+    def _notify(self, method: str, params: dict[str, Any] | None = None) -> None:
+        if self.notifier is not None:
+            self.notifier(method, params)
+
+    def _register_tool(self, simple_tool: SimpleTool) -> None:
+        # Convert SimpleTool to Tool objects
+        tool_obj: Tool = Tool(
+            name=simple_tool.name,
+            arguments=simple_tool.arguments,
+            description=simple_tool.description,
+            required_arguments=simple_tool.required_arguments,
+            func=simple_tool.func,
+            execution=simple_tool.execution,
+            cache=simple_tool.cache,
+            argument_schemas=simple_tool.argument_schemas,
+        )
+        index = bisect.bisect_left(self._tool_names, tool_obj.name)
+        self._tool_names.insert(index, tool_obj.name)
+        self._tool_objs.insert(index, tool_obj)
+        with self._definitions_lock:
+            if self._tool_definitions is not None:
+                self._tool_definitions.insert(index, self._tool_definition(tool_obj))
+        self.tool_funcs[tool_obj.name] = tool_obj.func
+        self.tool_execution[tool_obj.name] = tool_obj.execution
+        self._validators.pop(tool_obj.name, None)
+        if tool_obj.cache is not None:
+            self.tool_caches[tool_obj.name] = tool_obj.cache
+        self._tools_pages.clear()
+
+        if tool_obj.execution == "process" and self._process_pool is None:
+            # multiprocessing 只在注册了进程工具时才导入
+            from process_pool import ProcessToolPool
+
+            self._process_pool = ProcessToolPool(
+                max_workers=self._process_workers,
+                max_tasks_per_child=self._max_calls_per_worker,
             )
-            tool_definitions.append(tool_def)
+            self._process_pool.start()
+
+    def _unregister_tool(self, name: str) -> bool:
+        if name not in self.tool_funcs:
+            return False
+        del self.tool_funcs[name]
+        del self.tool_execution[name]
+        self.tool_caches.pop(name, None)
+        self._validators.pop(name, None)
+        index = bisect.bisect_left(self._tool_names, name)
+        del self._tool_names[index]
+        del self._tool_objs[index]
+        with self._definitions_lock:
+            if self._tool_definitions is not None:
+                del self._tool_definitions[index]
+        self._tools_pages.clear()
+        return True
+
+    @property
+    def tools(self) -> "list[ToolDefinition]":
+        """Definitions of all tools ordered by name, generated on first access"""
+        with self._definitions_lock:
+            if self._tool_definitions is None:
+                self._tool_definitions = [
+                    self._tool_definition(tool_obj) for tool_obj in self._tool_objs
+                ]
+                if self.schema_cache is not None:
+                    self.schema_cache.save()
+            return self._tool_definitions
+
+    def _tool_definition(self, tool_obj: Tool) -> "ToolDefinition":
+        if self.schema_cache is None:
+            return self._build_tool_definition(tool_obj)
+
+        key = tool_schema_key(
+            tool_obj.name,
+            tool_obj.description,
+            tool_obj.required_arguments,
+            tool_obj.arguments,
+            tool_obj.func,
+            tool_obj.argument_schemas,
+        )
+        cached = self.schema_cache.get(key)
+        if cached is not None:
+            from dto import ToolDefinition
+
+            return ToolDefinition.model_validate(cached)
+        definition = self._build_tool_definition(tool_obj)
+        self.schema_cache.put(key, definition.model_dump(exclude_none=True))
+        return definition
+
+    def _build_tool_definition(self, tool_obj: Tool) -> "ToolDefinition":
+        """Convert a Tool object to a ToolDefinition object"""
+        from dto import ToolDefinition, ToolInputSchema, ToolParameterProperty
+
+        # Parse docstring to get parameter descriptions
+        param_descriptions = self._parse_docstring_params(tool_obj.func)
+
+        # Convert function annotations to ToolParameterProperty objects
+        properties = {}
+        for param_name, param_type in tool_obj.arguments.items():
+            if param_name != "return":  # Skip return annotation
+                # Use description from docstring if available, otherwise use default
+                description = param_descriptions.get(
+                    param_name, f"Parameter {param_name}"
+                )
+                param_type = self._strip_optional(param_type)
+                type_string = self._get_type_string(param_type)
+                extra = {}
+                item_types = typing.get_args(param_type)
+                if item_types and typing.get_origin(param_type) is typing.Literal:
+                    extra["enum"] = list(item_types)
+                elif type_string == "array" and item_types:
+                    # 部分模型（例如 OpenAI function calling）要求 array 声明 items
+                    extra["items"] = {"type": self._get_type_string(item_types[0])}
+                extra.update(tool_obj.argument_schemas.get(param_name, {}))
+                properties[param_name] = ToolParameterProperty(
+                    type=type_string,
+                    description=description,
+                    **extra,
+                )
 
-        self.tools = tool_definitions
-        self.tool_funcs = {tool_obj.name: tool_obj.func for tool_obj in tool_objects}
-        self.session = session
+        input_schema = ToolInputSchema(
+            type="object",
+            properties=properties,
+            required=(
+                tool_obj.required_arguments if tool_obj.required_arguments else []
+            ),
+        )
 
-        logger.info(f"McpServer initialized with tools: {[t.name for t in self.tools]}")
+        return ToolDefinition(
+            name=tool_obj.name,
+            description=tool_obj.description,
+            inputSchema=input_schema,
+        )
 
     def _parse_docstring_params(self, func: callable) -> dict[str, str]:
         """
@@ -418,11 +1061,27 @@ class McpServer:
 
         return param_descriptions
 
+    @staticmethod
+    def _strip_optional(param_type):
+        """Optional[X] and X | None are described as X"""
+        if isinstance(param_type, type):
+            return param_type
+        if typing.get_origin(param_type) in (typing.Union, types.UnionType):
+            members = [arg for arg in typing.get_args(param_type) if arg is not type(None)]
+            if len(members) == 1:
+                return members[0]
+        return param_type
+
     def _get_type_string(self, param_type) -> str:
         """Convert Python type annotation to JSON schema type string"""
         if param_type is None:
             return "string"
 
+        param_type = self._strip_optional(param_type)
+        if not isinstance(param_type, type) and typing.get_origin(param_type) is typing.Literal:
+            values = typing.get_args(param_type)
+            return self._get_type_string(type(values[0])) if values else "string"
+
         if hasattr(param_type, "__name__"):
             type_name = param_type.__name__
             if type_name == "str":
@@ -435,6 +1094,8 @@ class McpServer:
                 return "boolean"
             elif type_name == "list":
                 return "array"
+            elif type_name == "dict":
+                return "object"
             else:
                 return "string"  # default fallback
         else:
@@ -446,31 +1107,96 @@ class McpServer:
 
     def initialize(
         self, protocolVersion: str, capabilities: dict = None, clientInfo: dict = None
-    ) -> InitializeJSONRPCResult:
+    ) -> "InitializeJSONRPCResult":
         """Initialize the server"""
+        from dto import InitializeJSONRPCResult
+
         logger.info(
             f"initialize called with protocolVersion: {protocolVersion}, capabilities: {capabilities}, clientInfo: {clientInfo}"
         )
-        return InitializeJSONRPCResult(id=None, is_error=False)
+        # HTTP 等传输层已经为每个连接绑定了会话；stdio 只有一个客户端，整个进程共用
+        # 一个会话，重复的 initialize 不替换它，正在处理的请求不会写到被丢弃的会话中
+        if self.session is None and self.session_factory is not None:
+            self.session = self.session_factory()
+            logger.info("ServerSession created for initialize")
+        return InitializeJSONRPCResult(
+            id=None, is_error=False, capabilities=self.list_capabilities()
+        )
 
     def notify_initialize(self) -> None:
         logger.info("recevice [notifications/initialized], just ack mechanism")
 
-    def list_tools(self, cursor: str | None = None) -> ListToolsJSONRPCResult:
-        """List all available tools"""
-        logger.info(f"list_tools called with cursor: {cursor}, tools: {self.tools}")
-        # For now, we don't support pagination, so cursor is ignored
-        return ListToolsJSONRPCResult(
-            id=None,  # This will be set by the calling code
-            tools=self.tools,
-            nextCursor=None,  # No pagination for now
-            is_error=False,
-        )
+    def list_tools(self, cursor: str | None = None) -> EncodedResult:
+        """
+        List available tools, one page per call
+
+        Tools are ordered by name. The cursor is opaque to clients; it encodes
+        the name of the last tool on the previous page, so paging stays
+        consistent even if tools are added or removed in between.
+        """
+        logger.info("list_tools called with cursor: %s, %d tools", cursor, len(self._tool_names))
+        start = 0 if cursor is None else self._decode_cursor(cursor)
+
+        payload = self._tools_pages.get(start)
+        if payload is None:
+            tools = self.tools
+            if self.page_size is None:
+                end = len(tools)
+            else:
+                end = start + self.page_size
+            page = tools[start:end]
+
+            next_cursor = None
+            if end < len(tools):
+                next_cursor = self._encode_cursor(page[-1].name)
+
+            from dto import ListToolsJSONRPCResult
+            from pydantic_core import to_json
+
+            result = ListToolsJSONRPCResult(
+                id=None,
+                tools=page,
+                nextCursor=next_cursor,
+                is_error=False,
+            )
+            # 只在工具注册表变化后重新编码，之后每次请求只需拼接 id
+            payload = to_json(result.result)
+            self._tools_pages[start] = payload
+        return EncodedResult(payload)
 
-    def call_tool(
-        self, name: str, arguments: dict | None = None
-    ) -> CallToolJSONRPCResult:
-        """Call a tool with the given arguments"""
+    def _encode_cursor(self, last_name: str) -> str:
+        return base64.urlsafe_b64encode(last_name.encode("utf-8")).decode("ascii")
+
+    def _decode_cursor(self, cursor: str) -> int:
+        """Return the index of the first tool after the cursor"""
+        try:
+            raw = base64.b64decode(cursor.encode("ascii"), altchars=b"-_", validate=True)
+            last_name = raw.decode("utf-8")
+        except (AttributeError, ValueError):
+            raise JsonRPCException(-32602, f"Invalid cursor: {cursor}")
+        return bisect.bisect_right(self._tool_names, last_name)
+
+    async def call_tool(
+        self, name: str, arguments: dict | None = None, _meta: dict | None = None
+    ) -> "CallToolJSONRPCResult":
+        """
+        Call a tool with the given arguments
+
+        `async def` tools are awaited on the event loop, regular tools run on
+        the tool thread pool so blocking I/O does not stall the server.
+        Generator tools are drained into one text result; when the request
+        carries `_meta.progressToken`, each chunk and every report_progress()
+        call is sent as notifications/progress.
+        """
+        from dto import CallToolJSONRPCResult, TextToolContent
+
+        progress_token = (_meta or {}).get("progressToken")
+        if progress_token is not None and self.notifier is not None:
+            current_progress.set(ProgressReporter(progress_token, self.notifier))
+        else:
+            current_progress.set(None)
+
+        started = time.perf_counter()
         try:
             if name not in self.tool_funcs:
                 logger.error(f"Tool '{name}' not found")
@@ -488,11 +1214,26 @@ class McpServer:
             if arguments is None:
                 arguments = {}
 
-            # Call the tool function
-            if self.session is not None:
-                result = tool_func(self.session, **arguments)
+            # 参数不符合 inputSchema 时直接返回 -32602，不执行工具
+            errors = self._input_validator(name)(arguments)
+            if errors:
+                raise JsonRPCException(
+                    -32602, f"Invalid arguments for tool '{name}': {'; '.join(errors)}"
+                )
+
+            # Call the tool function, through the result cache if it has one
+            cache = self.tool_caches.get(name)
+            if cache is None:
+                result = await self._run_tool(name, tool_func, arguments)
             else:
-                result = tool_func(**arguments)
+                key = cache.make_key(arguments)
+                hit, result = cache.get(key)
+                if hit:
+                    logger.debug("Tool '%s' cache hit", name)
+                else:
+                    result = await self._run_tool(name, tool_func, arguments)
+                    cache.put(key, result)
+            self._observe(name, started, False)
             # Convert result to TextToolContent
             content = [TextToolContent(text=str(result))]
 
@@ -502,7 +1243,12 @@ class McpServer:
                 is_error=False,
             )
 
+        except JsonRPCException:
+            # 参数校验失败同样计入该工具的请求数和错误数
+            self._observe(name, started, True)
+            raise
         except Exception as e:
+            self._observe(name, started, True)
             logger.error(f"Tool '{name}' execution failed: {str(e)}", exc_info=True)
             return CallToolJSONRPCResult(
                 id=None,  # This will be set by the calling code
@@ -511,45 +1257,426 @@ class McpServer:
                 error_message=f"Tool execution failed: {str(e)}",
             )
 
+    def _input_validator(self, name: str) -> Callable[[dict[str, Any]], list[str]]:
+        """The compiled argument check of a tool, built from its inputSchema on first use"""
+        validator = self._validators.get(name)
+        if validator is not None:
+            return validator
+
+        index = bisect.bisect_left(self._tool_names, name)
+        definition = self.tools[index]
+        schema = definition.inputSchema.model_dump(exclude_none=True)
+        properties = schema.setdefault("properties", {})
+
+        signature = inspect.signature(self._tool_objs[index].func)
+        accepts_any = False
+        for parameter in signature.parameters.values():
+            if parameter.kind is inspect.Parameter.VAR_KEYWORD:
+                accepts_any = True
+            elif parameter.kind is inspect.Parameter.VAR_POSITIONAL:
+                continue
+            elif parameter.name not in properties:
+                # 没有类型注解的参数（包括 session）不在 schema 中，不做检查
+                properties[parameter.name] = {}
+            elif parameter.default is None or self._strip_optional(
+                parameter.annotation
+            ) is not parameter.annotation:
+                # 默认值为 None 或 Optional 注解的参数可以显式传 null
+                prop = properties[parameter.name]
+                if "type" in prop:
+                    prop["type"] = [prop["type"], "null"]
+                if "enum" in prop:
+                    prop["enum"] = [*prop["enum"], None]
+        if not accepts_any:
+            schema["additionalProperties"] = False
+
+        validator = compile_validator(schema)
+        self._validators[name] = validator
+        return validator
+
+    def _observe(self, name: str, started: float, failed: bool) -> None:
+        if self.metrics is not None:
+            self.metrics.observe("tool", name, time.perf_counter() - started, failed)
+
+    async def _run_tool(
+        self, name: str, tool_func: Callable[..., Any], arguments: dict[str, Any]
+    ) -> Any:
+        if self.tool_execution[name] == "process":
+            # 进程池中的工具拿不到 session，只传 JSON 参数
+            return await self._process_pool.run(tool_func, arguments)
+
+        session = current_session.get() or self.session
+        if session is not None:
+            call = functools.partial(tool_func, session, **arguments)
+        else:
+            call = functools.partial(tool_func, **arguments)
+
+        if inspect.isasyncgenfunction(tool_func):
+            return await collect_async(call(), current_progress.get())
+        if inspect.iscoroutinefunction(tool_func):
+            return await call()
+
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._tool_executor, context.run, self._call_sync, call
+        )
+
+    @staticmethod
+    def _call_sync(call: Callable[[], Any]) -> Any:
+        result = call()
+        if inspect.isgenerator(result):
+            return collect(result, current_progress.get())
+        return result
+
+    def cache_stats(self) -> dict[str, Any]:
+        """Hit/miss/eviction counters of every cached tool"""
+        return {
+            "caches": {name: cache.stats() for name, cache in self.tool_caches.items()}
+        }
+
+    def invalidate_cache(
+        self, name: str | None = None, arguments: dict | None = None
+    ) -> dict[str, Any]:
+        """
+        Drop cached tool results
+
+        Args:
+            name (str, optional): tool name, all cached tools if omitted
+            arguments (dict, optional): only drop the entry for these arguments
+
+        Returns:
+            number of entries removed
+        """
+        if name is not None and name not in self.tool_caches:
+            raise JsonRPCException(-32602, f"Tool '{name}' has no cache")
+
+        names = [name] if name is not None else list(self.tool_caches)
+        invalidated = sum(self.tool_caches[n].invalidate(arguments) for n in names)
+        logger.info(f"Invalidated {invalidated} cached results for {names}")
+        return {"invalidated": invalidated}
+
+    # MCP 日志级别到 logging 级别的映射，notice 介于 INFO 和 WARNING 之间
+    LOGGING_LEVELS = {
+        "debug": logging.DEBUG,
+        "info": logging.INFO,
+        "notice": logging.INFO + 5,
+        "warning": logging.WARNING,
+        "error": logging.ERROR,
+        "critical": logging.CRITICAL,
+        "alert": logging.CRITICAL,
+        "emergency": logging.CRITICAL,
+    }
+
+    def set_logging_level(self, level: str) -> dict:
+        """
+        Handle logging/setLevel, adjusts the server log level at runtime
+
+        In MCP this method sets the minimum level of the notifications/message
+        log notifications sent to the client. This server does not send log
+        notifications, so the method is used as an operator control for the
+        server's own log file instead.
+        """
+        if level not in self.LOGGING_LEVELS:
+            raise JsonRPCException(-32602, f"Invalid log level: {level}")
+        if self.log_pipeline is not None:
+            self.log_pipeline.set_level(self.LOGGING_LEVELS[level])
+        else:
+            logging.getLogger().setLevel(self.LOGGING_LEVELS[level])
+        logger.warning("Log level set to %s", level)
+        return {}
+
     def notify_tool_change(self):
         logger.info("Tool list changed notification received")
 
-    # TODO to be supported
-    def list_prompts(self, cursor: str | None = None):
-        logger.info("list_prompts called (not implemented)")
-        return {"prompts": []}
+    def list_prompts(self, cursor: str | None = None) -> dict[str, Any]:
+        if self.prompts is None:
+            return {"prompts": []}
+        templates = self.prompts.list()
+        logger.info("list_prompts called, %d prompts", len(templates))
+        return {"prompts": [template.describe() for template in templates]}
+
+    def get_prompt(self, name: str, arguments: dict | None = None) -> dict[str, Any]:
+        logger.info("get_prompt called for '%s'", name)
+        template = self.prompts.get(name) if self.prompts is not None else None
+        if template is None:
+            raise JsonRPCException(-32602, f"Prompt not found: {name}")
+        try:
+            text = template.render(arguments)
+        except PromptArgumentError as e:
+            raise JsonRPCException(-32602, str(e))
+
+        result: dict[str, Any] = {
+            "messages": [{"role": "user", "content": {"type": "text", "text": text}}]
+        }
+        if template.description:
+            result["description"] = template.description
+        return result
 
-    # TODO to be supported
-    def get_prompt(self, name: str):
-        logger.info(f"get_prompt called for '{name}' (not implemented)")
-        return None
+    def watch_prompts(self, interval: float = 2.0) -> None:
+        """Reload prompt templates when their files change and notify clients"""
+        if self.prompts is not None:
+            self.prompts.watch(
+                lambda: self._notify("notifications/prompts/list_changed"), interval
+            )
 
-    # TODO to be supported
     def notify_prompt_change(self):
-        logger.info("notify_prompt_change called (not implemented)")
-
-    # TODO to be supported
-    def list_resources(self, cursor: str | None = None):
-        logger.info("list_resources called (not implemented)")
-        return {"resources": []}
+        # notifications/prompts/list_changed 由服务端在模板变化时发出（见 watch_prompts），
+        # 客户端发来的同名通知没有需要处理的内容
+        logger.info("Prompt list changed notification received")
+
+    def add_resource(self, resource: FileResource) -> None:
+        """Expose a file as a resource, notifying clients of the change"""
+        self.resources[resource.uri] = resource
+        logger.info("Resource '%s' added: %s", resource.uri, resource.path)
+        self._notify("notifications/resources/list_changed")
+
+    def remove_resource(self, uri: str) -> bool:
+        if self.resources.pop(uri, None) is None:
+            return False
+        logger.info("Resource '%s' removed", uri)
+        self._notify("notifications/resources/list_changed")
+        return True
+
+    def list_resources(self, cursor: str | None = None) -> dict[str, Any]:
+        logger.info("list_resources called, %d resources", len(self.resources))
+        return {"resources": [resource.describe() for resource in self.resources.values()]}
+
+    def read_resource(
+        self,
+        uri: str,
+        offset: int | None = None,
+        length: int | None = None,
+        startLine: int | None = None,
+        lineCount: int | None = None,
+    ) -> dict[str, Any]:
+        """
+        Read a resource, or a byte/line range of it
 
-    # TODO to be supported
-    def list_capabilities(self):
-        logger.info("list_capabilities called (not implemented)")
-        return {}
+        At most `resource_chunk_size` bytes are returned per call; `_meta`
+        of the result tells where the next chunk starts.
+        """
+        resource = self.resources.get(uri)
+        if resource is None:
+            raise JsonRPCException(-32002, f"Resource not found: {uri}")
+        try:
+            return resource.read(
+                offset=offset,
+                length=length,
+                start_line=startLine,
+                line_count=lineCount,
+                max_chunk=self.resource_chunk_size,
+            )
+        except ResourceRangeError as e:
+            raise JsonRPCException(-32602, str(e))
+        except FileNotFoundError:
+            raise JsonRPCException(-32002, f"Resource not found: {uri}")
+
+    def list_capabilities(self) -> "Capabilities":
+        """Capabilities advertised in the initialize result"""
+        from dto import Capabilities
+
+        return Capabilities(
+            tools={"listChanged": True},
+            logging={"listChanged": False},
+            # 模板文件变化时会发送 notifications/prompts/list_changed
+            prompts={"listChanged": self.prompts is not None},
+            # add_resource / remove_resource 会发送 notifications/resources/list_changed
+            resources={"subscribe": False, "listChanged": True},
+            completions={"listChanged": False},
+            experimental={"listChanged": False},
+        )
 
 
 if __name__ == "__main__":
-    logger.info("=" * 50)
-    logger.info("Starting MCP Server...")
-    logger.info("=" * 50)
+    # 在 Windows 上强制使用 UTF-8 编码
+    if sys.platform == "win32":
+        # 重新配置 stdout 和 stdin 为 UTF-8
+        if hasattr(sys.stdout, "reconfigure"):
+            sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+        if hasattr(sys.stdin, "reconfigure"):
+            sys.stdin.reconfigure(encoding="utf-8", errors="replace")
 
     # 使用 argparse 进行更优雅的参数处理
     parser = argparse.ArgumentParser(description="MCP Server 参数配置")
     parser.add_argument("--arg1", help="第一个参数")
     parser.add_argument("--arg2", help="第二个参数")
+    parser.add_argument(
+        "--mode",
+        choices=["sync", "async"],
+        default="sync",
+        help="sync: 逐行串行处理；async: 并发处理，响应按完成顺序返回",
+    )
+    parser.add_argument(
+        "--framing",
+        choices=["line", "content-length"],
+        default="line",
+        help="stdio 消息分帧：line 每行一条 JSON；content-length 为 LSP 风格的 Content-Length 头部，适合很大的消息",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "http"],
+        default="stdio",
+        help="stdio: 通过标准输入输出通信；http: 启动 HTTP 服务，可同时服务多个客户端",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="http 模式监听的地址")
+    parser.add_argument("--port", type=int, default=8000, help="http 模式监听的端口")
+    parser.add_argument(
+        "--store-shards",
+        type=int,
+        default=16,
+        help="会话共享存储的分片数",
+    )
+    parser.add_argument(
+        "--weather-data",
+        default=None,
+        help="get_weather 使用的地点数据文件，默认是脚本目录下的 weather_data.json",
+    )
+    parser.add_argument(
+        "--resource",
+        action="append",
+        default=[],
+        help="把文件作为 resource 暴露给客户端，可以多次指定",
+    )
+    parser.add_argument(
+        "--resource-chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="resources/read 单次返回的最大字节数",
+    )
+    parser.add_argument(
+        "--prompts-dir",
+        default=os.path.join(script_dir, "prompts"),
+        help="prompts/list 和 prompts/get 使用的模板目录",
+    )
+    parser.add_argument(
+        "--prompts-poll-interval",
+        type=float,
+        default=2.0,
+        help="检查模板文件是否变化的间隔秒数",
+    )
+    parser.add_argument(
+        "--schema-cache",
+        default=os.path.join(script_dir, ".tool_schema_cache.json"),
+        help="生成的工具 schema 的缓存文件，传空字符串关闭缓存",
+    )
+    parser.add_argument(
+        "--records-capacity",
+        type=int,
+        default=10_000,
+        help="每个会话在内存中保留的 get_weather 记录条数",
+    )
+    parser.add_argument(
+        "--records-log-dir",
+        default=None,
+        help="设置后每个会话的全部 get_weather 记录追加写入这个目录下的日志文件",
+    )
+    parser.add_argument(
+        "--log-mode",
+        choices=["sync", "async"],
+        default="sync",
+        help="async: 日志在后台线程中格式化和写文件，不阻塞请求处理",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["debug", "info", "warning", "error", "critical"],
+        default="debug",
+        help="初始日志级别，运行时可通过 logging/setLevel 调整",
+    )
+    parser.add_argument(
+        "--log-sample-rate",
+        type=float,
+        default=1.0,
+        help="DEBUG/INFO 日志按消息模板采样的比例，例如 0.1 表示每 10 条保留 1 条",
+    )
+    parser.add_argument(
+        "--log-max-length",
+        type=int,
+        default=2000,
+        help="单条日志消息的最大长度，超出部分被截断",
+    )
+    parser.add_argument(
+        "--serializer",
+        choices=["auto", "json", "orjson", "pydantic"],
+        default="auto",
+        help="响应编码方式，auto 在安装了 orjson 时使用 orjson，否则使用 pydantic",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=100,
+        help="tools/list 每页返回的工具数",
+    )
+    parser.add_argument(
+        "--tool-workers",
+        type=int,
+        default=8,
+        help="执行同步工具的线程池大小",
+    )
+    parser.add_argument(
+        "--process-workers",
+        type=int,
+        default=None,
+        help="执行 execution=\"process\" 工具的进程数，默认等于 CPU 核数",
+    )
+    parser.add_argument(
+        "--max-calls-per-worker",
+        type=int,
+        default=100,
+        help="工具子进程执行多少次调用后被替换",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=16,
+        help="async 模式下同时处理的最大请求数",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=64,
+        help="超出 --max-in-flight 时最多排队的请求数，队列满时请求立即返回过载错误",
+    )
+    parser.add_argument(
+        "--max-queue-wait",
+        type=float,
+        default=None,
+        help="请求最长排队秒数，超时返回过载错误，默认不限",
+    )
+    parser.add_argument(
+        "--tool-limit",
+        action="append",
+        default=[],
+        metavar="TOOL=N",
+        help="单个工具同时执行的最大调用数，可以重复指定，例如 --tool-limit get_weather_batch=2",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help="定期把方法和工具的耗时统计以 OpenMetrics 格式写入这个文件",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=15.0,
+        help="写 --metrics-file 的间隔秒数",
+    )
 
     args = parser.parse_args()
+    if args.page_size < 1:
+        parser.error(f"--page-size 必须大于等于 1：{args.page_size}")
+
+    # 按命令行参数配置日志
+    log_pipeline = LoggingPipeline(
+        log_file,
+        level=args.log_level.upper(),
+        mode=args.log_mode,
+        sample_rate=args.log_sample_rate,
+        max_message_length=args.log_max_length,
+    ).start()
+    logger.info("=" * 50)
+    logger.info("Starting MCP Server...")
+    logger.info("=" * 50)
 
     # 打印参数信息
     if args.arg1 is not None:
@@ -562,14 +1689,80 @@ if __name__ == "__main__":
     else:
         logger.info("没有提供参数2")
 
-    session = ServerSession(None)
+    # 所有会话共享的数据
+    shared_store = ShardedStore(shards=args.store_shards)
+
+    cities = CityIndex.load(args.weather_data) if args.weather_data else None
+
+    if args.records_log_dir:
+        os.makedirs(args.records_log_dir, exist_ok=True)
+
+    def new_session() -> ServerSession:
+        records_log = None
+        if args.records_log_dir:
+            records_log = os.path.join(
+                args.records_log_dir, f"records-{uuid.uuid4().hex}.log"
+            )
+        records = RecordStore(capacity=args.records_capacity, log_path=records_log)
+        return ServerSession(None, shared=shared_store, records=records, cities=cities)
+
+    session = new_session()
+
+    # 方法和工具的调用次数、错误数和耗时，通过 metrics/get 读取
+    metrics = MetricsRegistry()
+    metrics_writer = None
+    if args.metrics_file:
+        metrics_writer = MetricsFileWriter(
+            metrics, args.metrics_file, interval=args.metrics_interval
+        ).start()
 
     mcp_server = McpServer(
-        tools=[session.get_weather, session.list_get_weather_records], session=session
+        tools=[
+            session.get_weather,
+            session.get_weather_batch,
+            session.list_get_weather_records,
+        ],
+        session=session,
+        session_factory=new_session,
+        page_size=args.page_size,
+        max_workers=args.tool_workers,
+        process_workers=args.process_workers,
+        max_calls_per_worker=args.max_calls_per_worker,
+        metrics=metrics,
+        resources=[
+            FileResource(
+                args.weather_data or DEFAULT_DATASET,
+                uri="weather://dataset",
+                name="weather_data",
+                description="Locations, aliases and weather reports used by get_weather",
+            ),
+            *(FileResource(path) for path in args.resource),
+        ],
+        resource_chunk_size=args.resource_chunk_size,
+        prompts=PromptLibrary(args.prompts_dir),
+        schema_cache=ToolSchemaCache(args.schema_cache) if args.schema_cache else None,
     )
 
     # 创建 JSON RPC Server
-    server = JsonRPCServer()
+    tool_limits = {}
+    for spec in args.tool_limit:
+        tool_name, sep, limit = spec.partition("=")
+        if not sep or not limit.isdigit() or int(limit) < 1:
+            parser.error(f"--tool-limit 格式应为 TOOL=N（N >= 1）：{spec}")
+        tool_limits[tool_name] = int(limit)
+
+    server = JsonRPCServer(
+        max_in_flight=args.max_in_flight,
+        serializer=get_serializer(args.serializer),
+        metrics=metrics,
+        max_queue=args.max_queue,
+        tool_limits=tool_limits,
+        max_queue_wait=args.max_queue_wait,
+        framing=args.framing,
+    )
+    mcp_server.notifier = server.send_notification
+    mcp_server.log_pipeline = log_pipeline
+    mcp_server.watch_prompts(args.prompts_poll_interval)
 
     # 注册方法
     server.register_method("initialize", mcp_server.initialize)
@@ -577,6 +1770,13 @@ if __name__ == "__main__":
     server.register_method("tools/list", mcp_server.list_tools)
     server.register_method("tools/call", mcp_server.call_tool)
 
+    server.register_method("logging/setLevel", mcp_server.set_logging_level)
+    server.register_method("tools/cache/stats", mcp_server.cache_stats)
+    server.register_method("tools/cache/invalidate", mcp_server.invalidate_cache)
+    # 统计方法不经过准入控制，过载时也能读取
+    server.register_method("metrics/get", metrics.snapshot, admission=False)
+    server.register_method("admission/stats", server.admission_stats, admission=False)
+
     # Notifications (these don't return responses)
     server.register_method(
         "notifications/tools/list_changed", mcp_server.notify_tool_change
@@ -589,14 +1789,32 @@ if __name__ == "__main__":
     server.register_method("prompts/list", mcp_server.list_prompts)
     server.register_method("prompts/get", mcp_server.get_prompt)
     server.register_method("resources/list", mcp_server.list_resources)
+    server.register_method("resources/read", mcp_server.read_resource)
 
     logger.info("All methods registered, server starting...")
     logger.info(f"Registered methods: {list(server.methods.keys())}")
 
     try:
-        server.start()
+        if args.transport == "http":
+            from http_transport import HttpTransport
+
+            # 每个 HTTP 会话使用独立的 ServerSession
+            transport = HttpTransport(
+                server,
+                session_factory=new_session,
+                host=args.host,
+                port=args.port,
+            )
+            asyncio.run(transport.serve_forever())
+        elif args.mode == "async":
+            asyncio.run(server.start_async())
+        else:
+            server.start()
     except Exception as e:
         logger.error(f"Server error: {e}", exc_info=True)
     finally:
         logger.info("Server shutting down")
+        mcp_server.close()
+        if metrics_writer is not None:
+            metrics_writer.stop()
         sys.exit(0)
@@ -0,0 +1,184 @@
+"""Per-method and per-tool latency metrics
+
+JsonRPCServer 记录每个 JSON-RPC 方法、McpServer 记录每个工具的调用次数、错误数和
+耗时直方图。数据可以通过 `metrics/get` 方法读取，也可以由 MetricsFileWriter
+定期以 OpenMetrics 文本格式写到文件中，供 Prometheus 等工具采集。
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# 直方图桶的上界（秒），最后还有一个隐含的 +Inf 桶
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+class Histogram:
+    """Cumulative-style latency histogram with fixed buckets"""
+
+    __slots__ = ("counts", "count", "errors", "sum")
+
+    def __init__(self):
+        self.counts: list[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count: int = 0
+        self.errors: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, seconds: float, error: bool) -> None:
+        index = len(LATENCY_BUCKETS)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile, None if empty"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts[:-1]):
+            seen += bucket_count
+            if seen >= rank:
+                return LATENCY_BUCKETS[i]
+        return float("inf")
+
+    def to_dict(self) -> dict[str, Any]:
+        p99 = self.quantile(0.99)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum_seconds": self.sum,
+            "avg_seconds": self.sum / self.count if self.count else None,
+            "p50_seconds": self.quantile(0.5),
+            "p90_seconds": self.quantile(0.9),
+            # JSON 中没有 Infinity，超出最大桶时返回 None
+            "p99_seconds": None if p99 == float("inf") else p99,
+            "buckets": {
+                str(bound): count
+                for bound, count in zip(LATENCY_BUCKETS, self.counts)
+            },
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe store of histograms keyed by (kind, name)"""
+
+    KINDS = ("method", "tool")
+
+    def __init__(self):
+        self._histograms: dict[str, dict[str, Histogram]] = {
+            kind: {} for kind in self.KINDS
+        }
+        self._lock = threading.Lock()
+        self.started_at: float = time.time()
+
+    def observe(self, kind: str, name: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            histograms = self._histograms[kind]
+            histogram = histograms.get(name)
+            if histogram is None:
+                histogram = histograms[name] = Histogram()
+            histogram.observe(seconds, error)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Handle metrics/get"""
+        with self._lock:
+            return {
+                "uptimeSeconds": time.time() - self.started_at,
+                "methods": {
+                    name: h.to_dict() for name, h in self._histograms["method"].items()
+                },
+                "tools": {
+                    name: h.to_dict() for name, h in self._histograms["tool"].items()
+                },
+            }
+
+    def to_openmetrics(self) -> str:
+        lines = []
+        with self._lock:
+            for kind in self.KINDS:
+                histograms = self._histograms[kind]
+                prefix = f"mcp_{kind}"
+
+                lines.append(f"# TYPE {prefix}_calls counter")
+                lines.append(f"# HELP {prefix}_calls Number of {kind} calls.")
+                for name, h in histograms.items():
+                    lines.append(f'{prefix}_calls_total{{{kind}="{_escape(name)}"}} {h.count}')
+
+                lines.append(f"# TYPE {prefix}_errors counter")
+                lines.append(f"# HELP {prefix}_errors Number of failed {kind} calls.")
+                for name, h in histograms.items():
+                    lines.append(f'{prefix}_errors_total{{{kind}="{_escape(name)}"}} {h.errors}')
+
+                lines.append(f"# TYPE {prefix}_latency_seconds histogram")
+                lines.append(f"# UNIT {prefix}_latency_seconds seconds")
+                lines.append(f"# HELP {prefix}_latency_seconds Latency of {kind} calls.")
+                for name, h in histograms.items():
+                    label = f'{kind}="{_escape(name)}"'
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS, h.counts):
+                        cumulative += count
+                        lines.append(
+                            f'{prefix}_latency_seconds_bucket{{{label},le="{bound}"}} {cumulative}'
+                        )
+                    lines.append(
+                        f'{prefix}_latency_seconds_bucket{{{label},le="+Inf"}} {h.count}'
+                    )
+                    lines.append(f"{prefix}_latency_seconds_sum{{{label}}} {h.sum}")
+                    lines.append(f"{prefix}_latency_seconds_count{{{label}}} {h.count}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsFileWriter:
+    """Periodically dump a MetricsRegistry to a file in OpenMetrics text format"""
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = 15.0):
+        self.registry: MetricsRegistry = registry
+        self.path: str = path
+        self.interval: float = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-writer", daemon=True
+        )
+
+    def start(self) -> "MetricsFileWriter":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the thread and write a final dump"""
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+        self.write()
+
+    def write(self) -> None:
+        # 先写临时文件再替换，读取方不会看到写了一半的文件
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.registry.to_openmetrics())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error("Failed to write metrics to %s: %s", self.path, e)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.write()
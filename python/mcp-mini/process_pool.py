@@ -0,0 +1,112 @@
+"""Process pool for CPU-bound tools
+
+使用 `@tool(execution="process")` 声明的工具不在服务进程中执行，而是交给这里的
+`ProcessToolPool`，从而绕开 GIL，并把崩溃隔离在子进程内。
+
+- 工具函数按 (module, qualname) 引用传给子进程，由子进程自己 import，
+  不需要 pickle 函数对象本身（被 @tool 装饰后的名字指向的是 SimpleTool）
+- 参数来自 JSON，本身就能 pickle；返回值需要能 pickle，生成器在子进程内拼接成文本
+- 子进程执行 max_tasks_per_child 次后自动替换，防止内存泄漏累积
+- 子进程崩溃（segfault、被 kill）会使整个进程池失效（BrokenProcessPool）：当时
+  正在该进程池中执行和排队的所有调用都会失败，不只是崩溃的那一个；进程池随后被
+  重建，之后的调用不受影响
+"""
+
+import asyncio
+import importlib
+import inspect
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerCrashedError(Exception):
+    """Raised for every call pending on a pool when one of its worker processes died"""
+
+
+def _resolve(module_name: str, qualname: str) -> Callable[..., Any]:
+    obj: Any = getattr(importlib.import_module(module_name), qualname)
+    # @tool 装饰后模块里保存的是 SimpleTool，真正的函数在 func 属性上
+    return getattr(obj, "func", obj)
+
+
+def _run_in_worker(module_name: str, qualname: str, arguments: dict[str, Any]) -> Any:
+    func = _resolve(module_name, qualname)
+    result = func(**arguments)
+    # 生成器不能 pickle，在子进程内拼接成文本；进程池中的工具不发送进度通知
+    if inspect.isgenerator(result):
+        return "".join(str(chunk) for chunk in result)
+    return result
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+class ProcessToolPool:
+    """A warm, self-healing ProcessPoolExecutor for tool calls"""
+
+    def __init__(
+        self, max_workers: int | None = None, max_tasks_per_child: int | None = 100
+    ):
+        self.max_workers: int = max_workers or os.cpu_count() or 1
+        self.max_tasks_per_child: int | None = max_tasks_per_child
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Spawn the workers up front so the first call does not pay for it"""
+        self._get_pool()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    async def run(self, func: Callable[..., Any], arguments: dict[str, Any]) -> Any:
+        """Run func(**arguments) in a worker process"""
+        module_name, qualname = func.__module__, func.__qualname__
+        # 类中定义的方法在子进程里拿不到 self，嵌套函数无法 import，都只能在线程中执行
+        if "." in qualname:
+            raise ValueError(
+                f"Tool '{qualname}' can not run in a process, "
+                "it must be a function defined at module level"
+            )
+
+        pool = self._get_pool()
+        try:
+            future = pool.submit(_run_in_worker, module_name, qualname, arguments)
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            logger.error(f"Worker crashed while running '{qualname}', restarting pool")
+            self._discard(pool)
+            raise WorkerCrashedError("worker process crashed, pool restarted")
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # max_tasks_per_child 与 fork 不兼容，统一使用 spawn
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+                # 提交和 worker 数量相同的空任务，让进程提前启动
+                for _ in range(self.max_workers):
+                    self._pool.submit(_warm_up)
+                logger.info(f"Process pool started with {self.max_workers} workers")
+            return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        with self._lock:
+            # 其他并发调用可能已经重建过进程池
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,91 @@
+"""Progress notifications for long-running tools
+
+客户端在 tools/call 的 `params._meta.progressToken` 中携带 token 时，服务端在工具执行
+过程中发送 `notifications/progress`。工具有两种方式上报进度：
+
+    @tool()
+    def crawl(url: str):
+        for page in pages(url):
+            yield summarize(page)           # 生成器：每个 chunk 都是一次进度
+
+    @tool()
+    def convert(path: str) -> str:
+        for i, part in enumerate(parts):
+            report_progress(i + 1, total=len(parts), message=f"part {i + 1}")
+        return result
+
+生成器和 async 生成器工具的每个 chunk 作为 message 发出（progress 为已收到的 chunk 数），
+最终结果是所有 chunk 拼接后的文本。没有 progressToken 时不发送通知，结果相同。
+"""
+
+import threading
+from typing import Any, AsyncIterable, Callable, Iterable
+
+from cancellation import is_cancelled
+from request_context import current_progress
+
+
+class ProgressReporter:
+    """Send notifications/progress for one tools/call request"""
+
+    def __init__(
+        self,
+        token: str | int,
+        notify: Callable[[str, dict[str, Any] | None], None],
+    ):
+        self.token: str | int = token
+        self.notify: Callable[[str, dict[str, Any] | None], None] = notify
+        self.chunks: int = 0
+        self._lock = threading.Lock()
+
+    def report(
+        self, progress: float, total: float | None = None, message: str | None = None
+    ) -> None:
+        params: dict[str, Any] = {"progressToken": self.token, "progress": progress}
+        if total is not None:
+            params["total"] = total
+        if message is not None:
+            params["message"] = message
+        self.notify("notifications/progress", params)
+
+    def chunk(self, text: str) -> None:
+        with self._lock:
+            self.chunks += 1
+            count = self.chunks
+        self.report(count, message=text)
+
+
+def report_progress(
+    progress: float, total: float | None = None, message: str | None = None
+) -> None:
+    """Report progress of the running tool, a no-op if the client did not ask for it"""
+    reporter = current_progress.get()
+    if reporter is not None:
+        reporter.report(progress, total, message)
+
+
+def collect(chunks: Iterable[Any], reporter: ProgressReporter | None) -> str:
+    """Drain a generator tool, streaming each chunk as a progress notification"""
+    parts = []
+    for chunk in chunks:
+        # 请求被取消后不再继续生成
+        if is_cancelled():
+            break
+        text = str(chunk)
+        parts.append(text)
+        if reporter is not None:
+            reporter.chunk(text)
+    return "".join(parts)
+
+
+async def collect_async(
+    chunks: AsyncIterable[Any], reporter: ProgressReporter | None
+) -> str:
+    """Drain an async generator tool, streaming each chunk as a progress notification"""
+    parts = []
+    async for chunk in chunks:
+        text = str(chunk)
+        parts.append(text)
+        if reporter is not None:
+            reporter.chunk(text)
+    return "".join(parts)
@@ -0,0 +1,178 @@
+"""Prompt templates for prompts/list and prompts/get
+
+模板是目录下的 .md / .txt 文件，文件名（不含扩展名）就是 prompt 的名称。文件开头
+可以有一段 `---` 包围的头部，每行一个 `key: value`：
+
+    ---
+    description: System prompt of the D-Cline agent
+    argument.mcp_servers_section: Description of the connected MCP servers
+    ---
+    你是D-Cline ...
+    # MCP Server
+    {{mcp_servers_section}}
+
+正文中的 `{{name}}` 是必填参数，`{{name?}}` 是可选参数（缺省时替换为空串）。
+模板在加载时被编译成静态片段和参数的列表，渲染时只需要按顺序拼接；没有参数的
+模板直接缓存整段结果。PromptLibrary.watch 定期检查文件的修改时间，只重新编译
+变化的文件，并回调 on_change，由 McpServer 发送 notifications/prompts/list_changed。
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = (".md", ".txt")
+_PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)(\?)?\s*\}\}")
+
+
+class PromptArgumentError(ValueError):
+    """Raised when required prompt arguments are missing"""
+
+
+class PromptTemplate:
+    """A template compiled into static segments and argument slots"""
+
+    def __init__(self, name: str, text: str):
+        self.name: str = name
+        header, body = _split_header(text)
+        self.description: str | None = header.get("description")
+
+        # 偶数下标是静态文本，奇数下标是参数名
+        self.segments: list[str] = _PLACEHOLDER.split(body)[::3]
+        self.slots: list[str] = []
+        self.required: dict[str, bool] = {}
+        for match in _PLACEHOLDER.finditer(body):
+            argument, optional = match.group(1), match.group(2) == "?"
+            self.slots.append(argument)
+            # 同一个参数只要有一处必填就是必填
+            self.required[argument] = self.required.get(argument, False) or not optional
+
+        self.arguments: list[dict[str, Any]] = [
+            {
+                "name": argument,
+                "description": header.get(f"argument.{argument}", f"Argument {argument}"),
+                "required": required,
+            }
+            for argument, required in self.required.items()
+        ]
+        self._static: str | None = self.segments[0] if not self.slots else None
+
+    def describe(self) -> dict[str, Any]:
+        """The entry of this template in prompts/list"""
+        entry: dict[str, Any] = {"name": self.name, "arguments": self.arguments}
+        if self.description:
+            entry["description"] = self.description
+        return entry
+
+    def render(self, arguments: dict[str, Any] | None = None) -> str:
+        if self._static is not None:
+            return self._static
+        arguments = arguments or {}
+        missing = [
+            name for name, required in self.required.items()
+            if required and name not in arguments
+        ]
+        if missing:
+            raise PromptArgumentError(
+                f"Missing required arguments for prompt '{self.name}': {', '.join(missing)}"
+            )
+
+        parts = [self.segments[0]]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = arguments.get(slot)
+            parts.append("" if value is None else str(value))
+            parts.append(segment)
+        return "".join(parts)
+
+
+def _split_header(text: str) -> tuple[dict[str, str], str]:
+    if not text.startswith("---\n"):
+        return {}, text
+    end = text.find("\n---\n", 4)
+    if end == -1:
+        return {}, text
+    header: dict[str, str] = {}
+    for line in text[4:end].splitlines():
+        key, sep, value = line.partition(":")
+        if sep:
+            header[key.strip()] = value.strip()
+    return header, text[end + 5 :]
+
+
+class PromptLibrary:
+    """Templates loaded from a directory, recompiled when their files change"""
+
+    def __init__(self, directory: str):
+        self.directory: str = directory
+        self.templates: dict[str, PromptTemplate] = {}
+        # 文件名 -> (mtime_ns, size)，用来判断文件是否变化
+        self._signatures: dict[str, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: threading.Thread | None = None
+        self.refresh()
+
+    def get(self, name: str) -> PromptTemplate | None:
+        return self.templates.get(name)
+
+    def list(self) -> list[PromptTemplate]:
+        return sorted(self.templates.values(), key=lambda template: template.name)
+
+    def refresh(self) -> bool:
+        """Reload added, changed and removed files, returns whether anything changed"""
+        with self._lock:
+            signatures: dict[str, tuple[int, int]] = {}
+            try:
+                entries = list(os.scandir(self.directory))
+            except FileNotFoundError:
+                entries = []
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(TEMPLATE_EXTENSIONS):
+                    stat = entry.stat()
+                    signatures[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+            if signatures == self._signatures:
+                return False
+
+            # 复制一份再替换，读取方不需要加锁
+            templates = dict(self.templates)
+            for filename in self._signatures.keys() - signatures.keys():
+                templates.pop(os.path.splitext(filename)[0], None)
+            for filename, signature in signatures.items():
+                if self._signatures.get(filename) == signature:
+                    continue
+                path = os.path.join(self.directory, filename)
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        text = f.read().replace("\r\n", "\n")
+                except OSError as e:
+                    logger.error("Failed to load prompt template %s: %s", path, e)
+                    continue
+                name = os.path.splitext(filename)[0]
+                templates[name] = PromptTemplate(name, text)
+                logger.info("Prompt template '%s' compiled from %s", name, path)
+
+            self.templates = templates
+            self._signatures = signatures
+            return True
+
+    def watch(self, on_change: Callable[[], None], interval: float = 2.0) -> None:
+        """Poll the directory in a background thread and call on_change after a reload"""
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    if self.refresh():
+                        on_change()
+                except Exception as e:
+                    logger.error("Failed to reload prompt templates: %s", e, exc_info=True)
+
+        self._watcher = threading.Thread(target=run, name="prompt-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,135 @@
+"""Bounded storage for ServerSession lookup records
+
+内存中只保留最近 capacity 条记录（环形缓冲区），按地点的计数在写入和淘汰时增量
+维护，只覆盖仍能读取的记录，聚合查询不需要扫描记录。可选的追加日志把每条记录写成一行 JSON 字符串，
+同时在内存中保存每行的起始偏移（8 字节 / 条），分页读取历史记录时通过 mmap
+只解码需要的那几行，不会把整个文件读进内存。
+"""
+
+import json
+import mmap
+import os
+import threading
+from array import array
+from collections import Counter, deque
+from itertools import islice
+from typing import Any
+
+
+class RecordStore:
+    """Capped ring buffer of records with an optional append-only log"""
+
+    def __init__(self, capacity: int = 10_000, log_path: str | None = None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity: int = capacity
+        self.log_path: str | None = log_path
+        self.total: int = 0
+        self._recent: deque[str] = deque(maxlen=capacity)
+        self._counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+        self._log = None
+        self._offsets = array("Q")
+        self._log_size: int = 0
+        self._map: mmap.mmap | None = None
+        if log_path is not None:
+            self._open_log(log_path)
+
+    def _open_log(self, log_path: str) -> None:
+        # 已有的日志视为本 store 的历史记录，重建行偏移和计数
+        if os.path.exists(log_path) and os.path.getsize(log_path) > 0:
+            with open(log_path, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as data:
+                start = 0
+                while True:
+                    end = data.find(b"\n", start)
+                    if end == -1:
+                        break
+                    record = json.loads(data[start:end])
+                    self._offsets.append(start)
+                    self._recent.append(record)
+                    self._counts[record] += 1
+                    self.total += 1
+                    start = end + 1
+                self._log_size = start
+        # 需要可读，mmap 才能映射同一个文件描述符
+        self._log = open(log_path, "a+b")
+        # 截掉上次异常退出时可能写了一半的行
+        self._log.truncate(self._log_size)
+
+    def append(self, record: str) -> None:
+        with self._lock:
+            if self._log is None and len(self._recent) == self.capacity:
+                # 没有日志时被挤出环形缓冲区的记录不能再读取，计数也随之减去，
+                # 计数的键数不会超过 capacity
+                evicted = self._recent[0]
+                self._counts[evicted] -= 1
+                if not self._counts[evicted]:
+                    del self._counts[evicted]
+            self._recent.append(record)
+            self._counts[record] += 1
+            self.total += 1
+            if self._log is not None:
+                line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+                self._offsets.append(self._log_size)
+                self._log.write(line)
+                self._log_size += len(line)
+
+    def __len__(self) -> int:
+        """Number of records that can still be read"""
+        with self._lock:
+            return self._available()
+
+    def _available(self) -> int:
+        return len(self._offsets) if self._log is not None else len(self._recent)
+
+    def page(self, offset: int = 0, limit: int = 100) -> list[str]:
+        """Records [offset, offset + limit), oldest first"""
+        if offset < 0 or limit < 0:
+            raise ValueError("offset and limit must not be negative")
+        with self._lock:
+            available = self._available()
+            stop = min(offset + limit, available)
+            if offset >= stop:
+                return []
+            if self._log is None:
+                return list(islice(self._recent, offset, stop))
+            data = self._mapped()
+            end = self._log_size if stop == available else self._offsets[stop]
+            lines = data[self._offsets[offset] : end].splitlines()
+            return [json.loads(line) for line in lines]
+
+    def _mapped(self) -> mmap.mmap:
+        # 日志只会追加，映射的长度不够时重新映射整个文件
+        self._log.flush()
+        if self._map is None or len(self._map) < self._log_size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._log.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def counts(self, top: int | None = None) -> dict[str, int]:
+        """Number of records per value among the records that can still be read"""
+        with self._lock:
+            return dict(self._counts.most_common(top))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "total": self.total,
+                "available": self._available(),
+                "capacity": self.capacity,
+                "distinct": len(self._counts),
+                "log": self.log_path,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._log is not None:
+                self._log.close()
+                self._log = None
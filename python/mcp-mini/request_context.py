@@ -0,0 +1,28 @@
+"""Per-request context shared between JsonRPCServer, McpServer and the transports
+
+这些 ContextVar 由传输层在处理请求前设置，asyncio task 和线程池调用都会继承。
+单独放在一个模块里，mcp_server.py 以脚本方式运行时，传输层模块引用的也是同一份。
+"""
+
+import contextvars
+from typing import Any, Callable
+
+# 当前请求所属的 ServerSession，未设置时使用 McpServer.session
+current_session: contextvars.ContextVar[Any | None] = contextvars.ContextVar(
+    "current_session", default=None
+)
+
+# 当前请求的服务端 -> 客户端消息出口，未设置时使用 JsonRPCServer.default_notifier
+current_notifier: contextvars.ContextVar[Callable[[str], None] | None] = (
+    contextvars.ContextVar("current_notifier", default=None)
+)
+
+# 当前 tools/call 的进度上报器，请求没有携带 progressToken 时为 None
+current_progress: contextvars.ContextVar[Any | None] = contextvars.ContextVar(
+    "current_progress", default=None
+)
+
+# 当前请求的取消标志，客户端发送 notifications/cancelled 后被 set
+current_cancel_event: contextvars.ContextVar[Any | None] = contextvars.ContextVar(
+    "current_cancel_event", default=None
+)
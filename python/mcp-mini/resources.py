@@ -0,0 +1,241 @@
+"""File-backed MCP resources
+
+服务端把文件（日志、数据集等）作为 resource 暴露给客户端。resources/read 通过 mmap
+读取，只有请求的那一段会被换入内存，可以从几个 GB 的文件中取一小段：
+
+- 按字节：offset / length
+- 按行：  startLine / lineCount（行号从 0 开始）；单独一行超过 max_chunk 时只返回
+  它的开头，`_meta` 中带 truncated 和 nextOffset，剩下的部分按字节读取
+
+每次响应最多返回 max_chunk 字节，结果的 `_meta` 中给出下一段的起点（nextOffset 或
+nextLine），客户端据此继续读取，读到末尾时为 None。文本资源的分段边界会退到
+UTF-8 字符的起点，多字节字符不会被切开。
+
+按行读取使用稀疏行索引：每 LINE_INDEX_STRIDE 行记录一次起始偏移，索引随读取按需
+向后扩展，文件被改写（大小或修改时间变化）后重建。
+"""
+
+import base64
+import mmap
+import os
+import threading
+from typing import Any
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+LINE_INDEX_STRIDE = 1024
+# mimetypes 不认识、但按文本处理的扩展名
+TEXT_EXTENSIONS = (".log", ".jsonl", ".ndjson", ".md", ".csv", ".tsv")
+
+
+class ResourceRangeError(ValueError):
+    """Raised for an invalid byte or line range"""
+
+
+class FileResource:
+    """A file exposed as an MCP resource"""
+
+    def __init__(
+        self,
+        path: str,
+        uri: str | None = None,
+        name: str | None = None,
+        description: str | None = None,
+        mime_type: str | None = None,
+    ):
+        self.path: str = os.path.abspath(path)
+        self.uri: str = uri or f"file://{self.path}"
+        self.name: str = name or os.path.basename(self.path)
+        self.description: str | None = description
+        self.mime_type: str = mime_type or _guess_mime_type(self.path)
+        # 稀疏行索引：_checkpoints[k] 是第 k * LINE_INDEX_STRIDE 行的起始偏移
+        self._checkpoints: list[int] = [0]
+        # 已经扫描到的位置，及该位置对应的行号
+        self._scanned: tuple[int, int] = (0, 0)
+        self._signature: tuple[int, int] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_text(self) -> bool:
+        return self.mime_type.startswith("text/") or self.mime_type in (
+            "application/json",
+            "application/xml",
+            "application/x-ndjson",
+        )
+
+    def describe(self) -> dict[str, Any]:
+        """The entry of this resource in resources/list"""
+        entry: dict[str, Any] = {"uri": self.uri, "name": self.name, "mimeType": self.mime_type}
+        if self.description:
+            entry["description"] = self.description
+        try:
+            entry["size"] = os.path.getsize(self.path)
+        except OSError:
+            pass
+        return entry
+
+    def read(
+        self,
+        offset: int | None = None,
+        length: int | None = None,
+        start_line: int | None = None,
+        line_count: int | None = None,
+        max_chunk: int = DEFAULT_CHUNK_SIZE,
+    ) -> dict[str, Any]:
+        """Read a byte or line range, returns a resources/read result"""
+        if (offset is not None or length is not None) and (
+            start_line is not None or line_count is not None
+        ):
+            raise ResourceRangeError("use either offset/length or startLine/lineCount")
+        for value in (offset, length, start_line, line_count):
+            if value is not None and value < 0:
+                raise ResourceRangeError("range values must not be negative")
+
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                # 空文件不能 mmap
+                return self._result(b"", {"offset": 0, "size": 0, "nextOffset": None})
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if start_line is not None or line_count is not None:
+                    return self._read_lines(data, size, start_line or 0, line_count, max_chunk)
+
+                start = min(offset or 0, size)
+                want = max_chunk if length is None else min(length, max_chunk)
+                end = min(start + want, size)
+                if self.is_text:
+                    # 文本按字符切分，nextOffset 也落在字符边界上，拼接各段可以得到原文
+                    start = _char_start(data, start, size)
+                    end = max(_char_start(data, end, size), start)
+                    if end == start < size and want > 0:
+                        # max_chunk 比一个字符还小，至少返回这一个字符
+                        end = _char_end(data, start, size)
+                requested_end = size if length is None else min(start + length, size)
+                meta = {
+                    "offset": start,
+                    "size": size,
+                    "nextOffset": end if end < requested_end else None,
+                }
+                return self._result(data[start:end], meta)
+
+    def _read_lines(
+        self,
+        data: mmap.mmap,
+        size: int,
+        start_line: int,
+        line_count: int | None,
+        max_chunk: int,
+    ) -> dict[str, Any]:
+        start = self._line_offset(data, size, start_line)
+        if start is None or line_count == 0:
+            return self._result(
+                b"", {"startLine": start_line, "lineCount": 0, "size": size, "nextLine": None}
+            )
+
+        # 向后找 line_count 个换行符，同时不超过 max_chunk 字节
+        limit = min(start + max_chunk, size)
+        end = start
+        count = 0
+        while end < limit and (line_count is None or count < line_count):
+            newline = data.find(b"\n", end, limit)
+            if newline == -1:
+                if limit == size:
+                    # 最后一行没有换行符
+                    end = size
+                    count += 1
+                break
+            end = newline + 1
+            count += 1
+
+        truncated = False
+        if count == 0 and end < size:
+            # 单独一行就超过 max_chunk，按字节截断返回，下次从下一行开始
+            end = limit
+            if self.is_text:
+                end = max(_char_start(data, end, size), _char_end(data, start, size))
+            count = 1
+            truncated = True
+
+        more = end < size and (line_count is None or count < line_count)
+        meta = {
+            "startLine": start_line,
+            "lineCount": count,
+            "size": size,
+            "nextLine": start_line + count if more else None,
+        }
+        if truncated:
+            # 这一行剩下的部分可以从 nextOffset 开始按字节读取
+            meta["truncated"] = True
+            meta["nextOffset"] = end
+        return self._result(data[start:end], meta)
+
+    def _line_offset(self, data: mmap.mmap, size: int, line: int) -> int | None:
+        """Byte offset where the given line starts, None past the end of the file"""
+        with self._lock:
+            signature = (size, os.stat(self.path).st_mtime_ns)
+            if signature != self._signature:
+                self._checkpoints = [0]
+                self._scanned = (0, 0)
+                self._signature = signature
+
+            # 把索引扩展到覆盖目标行所在的区间
+            checkpoint = line // LINE_INDEX_STRIDE
+            position, scanned_line = self._scanned
+            while len(self._checkpoints) <= checkpoint and position < size:
+                newline = data.find(b"\n", position)
+                if newline == -1:
+                    position = size
+                    break
+                position = newline + 1
+                scanned_line += 1
+                if scanned_line % LINE_INDEX_STRIDE == 0 and position < size:
+                    self._checkpoints.append(position)
+            self._scanned = (position, scanned_line)
+
+            index = min(checkpoint, len(self._checkpoints) - 1)
+            position = self._checkpoints[index]
+
+        # 从最近的检查点向后数剩下的行
+        for _ in range(line - index * LINE_INDEX_STRIDE):
+            newline = data.find(b"\n", position)
+            if newline == -1 or newline + 1 >= size:
+                return None
+            position = newline + 1
+        return position if position < size else None
+
+    def _result(self, chunk: bytes, meta: dict[str, Any]) -> dict[str, Any]:
+        content: dict[str, Any] = {"uri": self.uri, "mimeType": self.mime_type}
+        if self.is_text:
+            content["text"] = chunk.decode("utf-8", errors="replace")
+        else:
+            content["blob"] = base64.b64encode(chunk).decode("ascii")
+        return {"contents": [content], "_meta": meta}
+
+
+def _char_start(data: mmap.mmap, position: int, size: int) -> int:
+    """Move position back to the first byte of the UTF-8 character it falls in"""
+    # 续字节的形式是 0b10xxxxxx，一个字符最多有 3 个续字节
+    floor = max(position - 3, 0)
+    while floor < position < size and data[position] & 0xC0 == 0x80:
+        position -= 1
+    return position
+
+
+def _char_end(data: mmap.mmap, position: int, size: int) -> int:
+    """Byte offset right after the UTF-8 character starting at position"""
+    position += 1
+    limit = min(position + 3, size)
+    while position < limit and data[position] & 0xC0 == 0x80:
+        position += 1
+    return position
+
+
+def _guess_mime_type(path: str) -> str:
+    # mimetypes 会拉起 urllib，只在注册资源时才导入
+    import mimetypes
+
+    guessed = mimetypes.guess_type(path)[0]
+    if guessed is not None:
+        return guessed
+    if path.lower().endswith(TEXT_EXTENSIONS):
+        return "text/plain"
+    return "application/octet-stream"
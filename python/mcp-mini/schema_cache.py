@@ -0,0 +1,96 @@
+"""On-disk cache of generated tool schemas
+
+McpServer 从函数的 docstring 和类型注解生成 ToolDefinition，工具多时这一步会拖慢
+每次启动。生成结果按工具缓存在一个 JSON 文件里，key 是生成 schema 用到的全部
+输入（名称、描述、必填参数、类型注解、docstring、argument_schemas）的 sha256，
+任何一项变化都会换成新的 key，不需要手动失效。SCHEMA_VERSION 在生成逻辑本身变化时
+递增。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+# 多个服务配置可以共用一个缓存文件，超过这个条数时只保留本次用到的条目
+MAX_ENTRIES = 10_000
+
+
+def tool_schema_key(
+    name: str,
+    description: str,
+    required_arguments: list[str],
+    arguments: dict[str, Any],
+    func: Callable[..., Any],
+    argument_schemas: dict[str, dict[str, Any]] | None = None,
+) -> str:
+    parts = [
+        str(SCHEMA_VERSION),
+        name,
+        description,
+        ",".join(required_arguments),
+        # 注解的 repr（例如 <class 'str'>、list[str]）在不同进程间是稳定的
+        repr(arguments),
+        func.__doc__ or "",
+        json.dumps(argument_schemas or {}, sort_keys=True),
+    ]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class ToolSchemaCache:
+    """Tool definitions keyed by tool_schema_key, persisted as one JSON file"""
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self._entries: dict[str, dict[str, Any]] | None = None
+        self._used: set[str] = set()
+        self._dirty: bool = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == SCHEMA_VERSION:
+                    self._entries = data["tools"]
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, KeyError, AttributeError) as e:
+                logger.warning("Ignoring unreadable tool schema cache %s: %s", self.path, e)
+        return self._entries
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            self._used.add(key)
+            return self._load().get(key)
+
+    def put(self, key: str, definition: dict[str, Any]) -> None:
+        with self._lock:
+            self._used.add(key)
+            self._load()[key] = definition
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write the file if anything was added, atomically via a temp file"""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = self._load()
+            if len(entries) > MAX_ENTRIES:
+                entries = {key: entries[key] for key in self._used if key in entries}
+                self._entries = entries
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"version": SCHEMA_VERSION, "tools": entries}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                logger.warning("Failed to write tool schema cache %s: %s", self.path, e)
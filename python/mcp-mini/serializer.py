@@ -0,0 +1,224 @@
+"""JSON-RPC response serializers
+
+`JsonRPCServer` 通过 serializer 把方法返回值编码成响应行。
+
+- PydanticSerializer: 通过 dto 中的 pydantic 模型 `model_dump_json`，即原始实现
+- FastSerializer: 直接拼装响应 dict，再用 JSON 库编码，跳过 pydantic
+
+FastSerializer 的输出与 PydanticSerializer 逐字节一致。遇到无法保证一致的数据
+（非 JSON 原生类型、NaN/Infinity、使用指数形式的浮点数等）时自动回退到 pydantic。
+
+dto（pydantic）在第一次需要时才导入，FastSerializer 编码普通 dict 和错误响应时
+完全不需要它。
+"""
+
+import json
+import re
+import sys
+from typing import Any
+
+# pydantic 输出 1e20，json/orjson 输出 1e+20，含指数的浮点数需要交给 pydantic
+_EXPONENT_FLOAT = re.compile(r"[0-9]e[+-][0-9]")
+
+
+class EncodedResult:
+    """
+    A `result` member that is already encoded as JSON.
+
+    Methods whose result rarely changes (e.g. tools/list) can cache the encoded
+    bytes and return them wrapped in this class; the serializer then only
+    splices in the request id.
+    """
+
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: bytes):
+        self.payload: bytes = payload
+
+
+class _Unsupported(Exception):
+    """Raised when a value can not be encoded identically by the fast path"""
+
+
+def _reject(obj: Any) -> Any:
+    raise _Unsupported(type(obj).__name__)
+
+
+class StdlibJsonBackend:
+    """Compact JSON through the standard library encoder"""
+
+    name = "json"
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(
+            ensure_ascii=False,
+            separators=(",", ":"),
+            allow_nan=False,
+            default=_reject,
+        )
+
+    def dumps(self, obj: Any) -> str | None:
+        try:
+            text = self._encoder.encode(obj)
+        except (_Unsupported, TypeError, ValueError):
+            return None
+        if _EXPONENT_FLOAT.search(text):
+            return None
+        return text
+
+
+class OrjsonBackend:
+    """Compact JSON through orjson, only available when orjson is installed"""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        # datetime、dataclass 和 str/int/dict/list 的子类交给 default，由 pydantic 编码；
+        # 例如带时区的 datetime，orjson 输出 +00:00，pydantic 输出 Z
+        self._options = (
+            orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_DATACLASS
+            | orjson.OPT_PASSTHROUGH_SUBCLASS
+        )
+
+    def dumps(self, obj: Any) -> str | None:
+        try:
+            encoded = self._orjson.dumps(obj, default=_reject, option=self._options)
+        except TypeError:
+            # default 中抛出的 _Unsupported 被 orjson 包装成 JSONEncodeError（TypeError 的子类）
+            return None
+        text = encoded.decode("utf-8")
+        if _EXPONENT_FLOAT.search(text):
+            return None
+        return text
+
+
+class PydanticSerializer:
+    """Encode responses through the pydantic DTO models"""
+
+    name = "pydantic"
+
+    def encode_result(self, request_id: str | int | None, result: Any) -> str:
+        if isinstance(result, EncodedResult):
+            return _splice(request_id, result.payload)
+        from dto import JSONRPCResult
+
+        # Check if result is already a JSONRPCResult object
+        if isinstance(result, JSONRPCResult):
+            result.id = request_id
+            return result.to_json()
+        else:
+            return JSONRPCResult(id=request_id, result=result).to_json()
+
+    def encode_error(
+        self, request_id: str | int | None, code: int, message: str
+    ) -> str:
+        from dto import JSONRPCError, JSONRPCResult
+
+        return JSONRPCResult(
+            id=request_id, error=JSONRPCError(code=code, message=message)
+        ).to_json()
+
+
+class FastSerializer(PydanticSerializer):
+    """
+    Encode responses from plain dicts.
+
+    `JSONRPCResult`, `ListToolsJSONRPCResult` and `CallToolJSONRPCResult`
+    already hold their payload as a dict in `.result`, so the response
+    envelope is assembled by hand in the same field order pydantic uses
+    (id, result, error, jsonrpc, with None fields left out).
+    """
+
+    def __init__(self, backend: StdlibJsonBackend | OrjsonBackend):
+        self.backend = backend
+        self.name = backend.name
+
+    def encode_result(self, request_id: str | int | None, result: Any) -> str:
+        if isinstance(result, EncodedResult):
+            return _splice(request_id, result.payload)
+        # dto 还没有导入时，result 不可能是 JSONRPCResult
+        dto = sys.modules.get("dto")
+        if dto is not None and isinstance(result, dto.JSONRPCResult):
+            payload, error = result.result, result.error
+            if error is not None:
+                error = error.model_dump(exclude_none=True)
+        else:
+            payload, error = result, None
+
+        # 只处理 pydantic 不会做类型转换的情况，其余交给 pydantic
+        if (payload is None or type(payload) is dict) and _is_plain_id(request_id):
+            text = self.backend.dumps(_envelope(request_id, payload, error))
+            if text is not None:
+                return text
+        return super().encode_result(request_id, result)
+
+    def encode_error(
+        self, request_id: str | int | None, code: int, message: str
+    ) -> str:
+        if _is_plain_id(request_id) and type(code) is int and type(message) is str:
+            error = {"code": code, "message": message}
+            text = self.backend.dumps(_envelope(request_id, None, error))
+            if text is not None:
+                return text
+        return super().encode_error(request_id, code, message)
+
+
+def _is_plain_id(request_id: Any) -> bool:
+    return request_id is None or type(request_id) in (str, int)
+
+
+def _splice(request_id: str | int | None, payload: bytes) -> str:
+    result = payload.decode("utf-8")
+    if request_id is None:
+        return '{"result":' + result + ',"jsonrpc":"2.0"}'
+    if type(request_id) is int:
+        encoded_id = str(request_id)
+    else:
+        encoded_id = json.dumps(request_id, ensure_ascii=False)
+    return '{"id":' + encoded_id + ',"result":' + result + ',"jsonrpc":"2.0"}'
+
+
+def _envelope(
+    request_id: str | int | None,
+    result: dict[str, Any] | None,
+    error: dict[str, Any] | None,
+) -> dict[str, Any]:
+    envelope = {}
+    if request_id is not None:
+        envelope["id"] = request_id
+    if result is not None:
+        envelope["result"] = result
+    if error is not None:
+        envelope["error"] = error
+    envelope["jsonrpc"] = "2.0"
+    return envelope
+
+
+def get_serializer(name: str = "auto") -> PydanticSerializer:
+    """
+    Create a response serializer
+
+    Args:
+        name (str): "pydantic", "json", "orjson", or "auto" (orjson if installed, else pydantic)
+
+    Returns:
+        the serializer instance
+    """
+    if name == "pydantic":
+        return PydanticSerializer()
+    if name == "json":
+        return FastSerializer(StdlibJsonBackend())
+    if name == "orjson":
+        return FastSerializer(OrjsonBackend())
+    if name == "auto":
+        # pydantic-core 的序列化本身很快，标准库 json 并不比它快，
+        # 所以只有装了 orjson 时才默认走快速路径
+        try:
+            return FastSerializer(OrjsonBackend())
+        except ImportError:
+            return PydanticSerializer()
+    raise ValueError(f"Unknown serializer: {name}")
@@ -0,0 +1,65 @@
+"""Sharded key-value store shared by all ServerSession instances
+
+每个客户端会话有自己的 ServerSession，会话之间需要共享的数据放在 ShardedStore 中。
+key 按 hash 分到多个分片，每个分片有独立的锁，不同 key 的读写很少互相等待。
+"""
+
+import threading
+from typing import Any, Callable
+
+
+class ShardedStore:
+    """A thread-safe dict split into independently locked shards"""
+
+    def __init__(self, shards: int = 16):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self._locks: list[threading.Lock] = [threading.Lock() for _ in range(shards)]
+        self._shards: list[dict[str, Any]] = [{} for _ in range(shards)]
+
+    def _shard(self, key: str) -> tuple[threading.Lock, dict[str, Any]]:
+        index = hash(key) % len(self._shards)
+        return self._locks[index], self._shards[index]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        lock, shard = self._shard(key)
+        with lock:
+            return shard.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        lock, shard = self._shard(key)
+        with lock:
+            shard[key] = value
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        lock, shard = self._shard(key)
+        with lock:
+            return shard.pop(key, default)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        lock, shard = self._shard(key)
+        with lock:
+            value = shard.get(key, 0) + amount
+            shard[key] = value
+            return value
+
+    def update(self, key: str, func: Callable[[Any], Any], default: Any = None) -> Any:
+        """Atomically replace the value with func(old value), returns the new value"""
+        lock, shard = self._shard(key)
+        with lock:
+            value = func(shard.get(key, default))
+            shard[key] = value
+            return value
+
+    def items(self, prefix: str = "") -> list[tuple[str, Any]]:
+        """Snapshot of all entries whose key starts with prefix"""
+        result = []
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                result.extend(
+                    (key, value) for key, value in shard.items() if key.startswith(prefix)
+                )
+        return result
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
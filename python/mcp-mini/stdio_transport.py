@@ -0,0 +1,248 @@
+"""Binary stdio transport for JsonRPCServer
+
+直接读写 sys.stdin.buffer / sys.stdout.buffer，不经过文本层：
+
+- 读取：StdioReader 每次读出当前已经到达的全部字节，自己切分消息，一次调用可以
+  返回多条消息；消息长度没有限制，几 MB 的单行消息也可以完整读出；每条消息只做
+  一次 UTF-8 解码
+- 写入：StdioWriter 把已经就绪的多条响应合并成一次 write + flush。异步模式下同一轮
+  事件循环中完成的响应一起写出；其它线程（例如工具线程发出的通知）写入时，如果
+  已经有线程在写，只追加到待写列表，由正在写的线程一并写出
+
+两种分帧方式：
+
+- line：每条消息一行（默认，MCP stdio 的标准方式）
+- content-length：LSP 风格，`Content-Length: N\\r\\n\\r\\n` 后跟 N 字节消息体，
+  消息体可以包含任意字节，适合很大的结果
+"""
+
+import asyncio
+import logging
+import re
+import threading
+from collections import deque
+from typing import BinaryIO
+
+logger = logging.getLogger(__name__)
+
+FRAMINGS = ("line", "content-length")
+# content-length 模式下单条消息的上限，防止错误的头部导致一次分配巨大的内存
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+# 错误的帧之后从这里重新同步
+_CONTENT_LENGTH_HEADER = re.compile(rb"content-length[ \t]*:", re.IGNORECASE)
+
+
+class FramingError(ValueError):
+    """Raised for a malformed Content-Length header block"""
+
+
+class StdioReader:
+    """
+    Splits a binary stream into messages
+
+    Reads whatever is available (up to READ_SIZE bytes per call) into its own
+    buffer, so one call can return every message that has already arrived;
+    a message larger than the buffer just makes the buffer grow.
+    """
+
+    READ_SIZE = 256 * 1024
+
+    def __init__(self, stream: BinaryIO, framing: str = "line"):
+        if framing not in FRAMINGS:
+            raise ValueError(f"framing must be one of {FRAMINGS}, got {framing!r}")
+        self.stream: BinaryIO = stream
+        self.framing: str = framing
+        self._buffer = bytearray()
+        # 行模式下已经确认不含换行符的前缀长度，超长的行不会被重复扫描
+        self._scanned: int = 0
+        self._ready: deque[str] = deque()
+        self._eof: bool = False
+        # content-length 模式下遇到错误的头部后，正在寻找下一个头部
+        self._resyncing: bool = False
+
+    def read_message(self) -> str | None:
+        """Return the next message, None at end of input"""
+        if not self._ready:
+            messages = self.read_messages()
+            if messages is None:
+                return None
+            self._ready.extend(messages)
+        return self._ready.popleft()
+
+    def read_messages(self) -> list[str] | None:
+        """Block until at least one message is complete, return all complete ones, None at end of input"""
+        if self._ready:
+            messages = list(self._ready)
+            self._ready.clear()
+            return messages
+        while True:
+            messages = self._split()
+            if messages:
+                return messages
+            if self._eof:
+                return None
+            chunk = self.stream.read1(self.READ_SIZE)
+            if chunk:
+                self._buffer += chunk
+            else:
+                self._eof = True
+
+    def _split(self) -> list[str]:
+        if self.framing == "content-length":
+            return self._split_frames()
+        buffer = self._buffer
+        messages: list[str] = []
+        start = 0
+        search = self._scanned
+        while True:
+            newline = buffer.find(b"\n", search)
+            if newline == -1:
+                if self._eof and start < len(buffer):
+                    # 最后一行没有换行符
+                    newline = len(buffer)
+                else:
+                    break
+            line = bytes(buffer[start:newline]).strip()
+            if line:
+                messages.append(line.decode("utf-8", errors="replace"))
+            start = search = newline + 1
+        del buffer[:start]
+        self._scanned = len(buffer)
+        return messages
+
+    def _split_frames(self) -> list[str]:
+        buffer = self._buffer
+        messages: list[str] = []
+        start = 0
+        try:
+            while True:
+                if self._resyncing:
+                    # 出错的消息体长度未知，丢弃输入直到下一个 Content-Length 头部
+                    found = _CONTENT_LENGTH_HEADER.search(buffer, start)
+                    if found is None:
+                        # 末尾可能是半个头部名，留到下次拼接
+                        start = len(buffer) if self._eof else max(
+                            start, len(buffer) - len(b"content-length:") + 1
+                        )
+                        break
+                    start = found.start()
+                    self._resyncing = False
+                # 消息之间多余的空行
+                while buffer.startswith(b"\r\n", start):
+                    start += 2
+                end = buffer.find(b"\r\n\r\n", start)
+                if end == -1:
+                    if self._eof and buffer[start:].strip() and not messages:
+                        start = len(buffer)
+                        raise FramingError("Input ended inside a header block")
+                    break
+                try:
+                    length = self._content_length(bytes(buffer[start:end]))
+                except FramingError:
+                    if messages:
+                        break  # 先返回已经读到的消息，下次调用再报告错误
+                    # 丢弃出错的头部，消息体在下次读取时跳过
+                    start = end + 4
+                    self._resyncing = True
+                    raise
+                body_start = end + 4
+                if len(buffer) - body_start < length:
+                    if self._eof and not messages:
+                        start = len(buffer)
+                        raise FramingError(f"Input ended inside a {length} byte message")
+                    break
+                body = bytes(buffer[body_start : body_start + length])
+                messages.append(body.decode("utf-8", errors="replace"))
+                start = body_start + length
+        finally:
+            del buffer[:start]
+        return messages
+
+    @staticmethod
+    def _content_length(headers: bytes) -> int:
+        length = None
+        for header in headers.split(b"\r\n"):
+            name, sep, value = header.partition(b":")
+            if not sep:
+                raise FramingError(f"Invalid header line: {header[:100]!r}")
+            if name.strip().lower() == b"content-length":
+                try:
+                    length = int(value.strip())
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_FRAME_SIZE:
+                    raise FramingError(f"Invalid Content-Length: {value.strip()[:100]!r}")
+            # Content-Type 等其它头部忽略
+        if length is None:
+            raise FramingError("Missing Content-Length header")
+        return length
+
+
+class StdioWriter:
+    """Thread-safe writer that coalesces ready messages into one write and flush"""
+
+    def __init__(self, stream: BinaryIO, framing: str = "line"):
+        if framing not in FRAMINGS:
+            raise ValueError(f"framing must be one of {FRAMINGS}, got {framing!r}")
+        self.stream: BinaryIO = stream
+        self.framing: str = framing
+        self._pending: list[bytes] = []
+        self._lock = threading.Lock()
+        # 是否有线程正在写；该线程会一直写到待写列表为空
+        self._writing: bool = False
+        self._flush_scheduled: bool = False
+        # 写出的消息数和实际的 write 次数
+        self.messages: int = 0
+        self.writes: int = 0
+
+    def _frame(self, message: str) -> bytes:
+        body = message.encode("utf-8")
+        if self.framing == "content-length":
+            return b"Content-Length: %d\r\n\r\n" % len(body) + body
+        return body + b"\n"
+
+    def write(self, message: str) -> None:
+        """Write a message now, or hand it to the thread that is already writing"""
+        data = self._frame(message)
+        with self._lock:
+            self._pending.append(data)
+            if self._writing:
+                return
+            self._writing = True
+        self._drain()
+
+    def write_soon(self, message: str, loop: asyncio.AbstractEventLoop) -> None:
+        """Queue a message from the event loop thread, written at the end of this loop iteration"""
+        data = self._frame(message)
+        with self._lock:
+            self._pending.append(data)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        """Write everything that is pending"""
+        with self._lock:
+            self._flush_scheduled = False
+            if self._writing or not self._pending:
+                return
+            self._writing = True
+        self._drain()
+
+    def _drain(self) -> None:
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._writing = False
+                        return
+                    chunks, self._pending = self._pending, []
+                self.stream.write(b"".join(chunks))
+                self.stream.flush()
+                self.messages += len(chunks)
+                self.writes += 1
+        except BaseException:
+            with self._lock:
+                self._writing = False
+            raise
@@ -0,0 +1,120 @@
+"""Result memoization for idempotent tools
+
+通过 `@tool(cache=...)` 开启，McpServer 在调用工具前先查缓存：
+
+    @tool(cache=True)                               # 默认 maxsize=128, ttl=300 秒
+    @tool(cache={"maxsize": 1024, "ttl": 60})
+    @tool(cache=ToolCache(maxsize=16, ttl=None))    # ttl=None 表示永不过期
+
+缓存 key 是规范化后的参数：补全默认值后按参数名排序编码成 JSON，所以
+{"b": 1, "a": 2} 与 {"a": 2, "b": 1} 命中同一条。缓存按工具共享，不区分 session，
+只适合结果只由参数决定的工具。
+"""
+
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class ToolCache:
+    """A thread-safe LRU cache with per-entry TTL and hit/miss/eviction counters"""
+
+    def __init__(self, maxsize: int = 128, ttl: float | None = 300):
+        self.maxsize: int = maxsize
+        self.ttl: float | None = ttl
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._defaults: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+
+    def bind(self, func: Callable[..., Any]) -> None:
+        """Remember the tool's default argument values for key normalization"""
+        self._defaults = {
+            p.name: p.default
+            for p in inspect.signature(func).parameters.values()
+            if p.default is not inspect.Parameter.empty
+        }
+
+    def make_key(self, arguments: dict[str, Any]) -> str:
+        if self._defaults:
+            arguments = {**self._defaults, **arguments}
+        return json.dumps(
+            arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+        )
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """Return (True, value) on a hit, (False, None) on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def put(self, key: str, value: Any) -> None:
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, arguments: dict[str, Any] | None = None) -> int:
+        """
+        Drop cached results
+
+        Args:
+            arguments (dict, optional): drop only the entry for these arguments, all entries if None
+
+        Returns:
+            number of entries removed
+        """
+        with self._lock:
+            if arguments is None:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            return 1 if self._entries.pop(self.make_key(arguments), None) else 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def make_tool_cache(option: bool | dict[str, Any] | ToolCache | None) -> ToolCache | None:
+    """Turn the `cache=` option of @tool into a ToolCache (or None when disabled)"""
+    if option is None or option is False:
+        return None
+    if option is True:
+        return ToolCache()
+    if isinstance(option, dict):
+        return ToolCache(**option)
+    if isinstance(option, ToolCache):
+        return option
+    raise TypeError(f"cache must be a bool, dict or ToolCache, got {type(option).__name__}")
@@ -0,0 +1,115 @@
+"""Tool declarations
+
+`@tool` 装饰器和工具的定义放在这个模块里，只依赖标准库和 tool_cache，导入时没有
+副作用（不配置日志、不读环境变量、不加载 pydantic），工具模块（例如 client/tools.py）
+可以只导入这里而不拉起整个服务端。McpServer 在注册时才把工具转换成 ToolDefinition。
+"""
+
+import inspect
+from typing import Any, Callable
+
+from tool_cache import ToolCache, make_tool_cache
+
+
+class Tool:
+    def __init__(
+        self,
+        name: str,
+        arguments: dict[str, Any],
+        description: str,
+        required_arguments: list[str],
+        func: Callable[..., Any],
+        execution: str = "thread",
+        cache: ToolCache | None = None,
+        argument_schemas: dict[str, dict[str, Any]] | None = None,
+    ):
+        self.name: str = name
+        self.arguments: dict[str, Any] = arguments
+        self.description: str = description
+        self.required_arguments: list[str] = required_arguments
+        self.func: Callable[..., Any] = func
+        self.execution: str = execution
+        self.cache: ToolCache | None = cache
+        # 合并到各参数 inputSchema 中的额外 JSON Schema 关键字，例如 {"limit": {"minimum": 0}}
+        self.argument_schemas: dict[str, dict[str, Any]] = argument_schemas or {}
+
+
+class SimpleTool:
+    def __init__(
+        self,
+        name: str,
+        arguments: dict[str, Any],
+        description: str,
+        required_arguments: list[str],
+        func: callable,
+        execution: str = "thread",
+        cache: ToolCache | None = None,
+        argument_schemas: dict[str, dict[str, Any]] | None = None,
+    ):
+        self.name: str = name
+        self.arguments: dict[str, Any] = arguments
+        self.description: str = description
+        self.required_arguments: list[str] = required_arguments
+        self.func: callable = func
+        self.execution: str = execution
+        self.cache: ToolCache | None = cache
+        # 合并到各参数 inputSchema 中的额外 JSON Schema 关键字，例如 {"limit": {"minimum": 0}}
+        self.argument_schemas: dict[str, dict[str, Any]] = argument_schemas or {}
+
+
+TOOL_EXECUTION_POLICIES = ("thread", "process")
+
+
+def tool(
+    name: str | None = None,
+    description: str | None = None,
+    required_arguments: list[str] | None = None,
+    execution: str = "thread",
+    cache: bool | dict[str, Any] | ToolCache | None = None,
+    argument_schemas: dict[str, dict[str, Any]] | None = None,
+) -> Callable[[callable], SimpleTool]:
+    """
+    Declare a function as an MCP tool
+
+    Args:
+        name (str, optional): tool name, defaults to the function name
+        description (str, optional): tool description, defaults to the docstring
+        required_arguments (list[str], optional): names of required arguments
+        execution (str, optional): "thread" runs sync tools on the tool thread
+            pool; "process" runs the tool in a worker process for CPU-bound
+            work. Process tools must be defined at module level, take only
+            JSON arguments (no session), and return a picklable value.
+        cache (bool | dict | ToolCache, optional): memoize results in an LRU
+            cache with TTL, keyed by the normalized arguments. True uses the
+            defaults, a dict is passed to ToolCache(maxsize=..., ttl=...).
+            Only for tools whose result depends on the arguments alone.
+        argument_schemas (dict, optional): extra JSON Schema keywords per
+            argument, merged into the generated inputSchema and checked
+            before the call, e.g. {"limit": {"minimum": 0}}
+
+    The function may also be a generator (or async generator) that yields
+    partial output, or call report_progress(); see progress.py.
+    """
+    if required_arguments is None:
+        required_arguments = []
+    if execution not in TOOL_EXECUTION_POLICIES:
+        raise ValueError(
+            f"execution must be one of {TOOL_EXECUTION_POLICIES}, got {execution!r}"
+        )
+
+    def decorator(func):
+        tool_cache = make_tool_cache(cache)
+        if tool_cache is not None:
+            tool_cache.bind(func)
+        return SimpleTool(
+            name=name or func.__name__,
+            description=description or inspect.getdoc(func) or "",
+            arguments=func.__annotations__,
+            required_arguments=required_arguments,
+            func=func,
+            execution=execution,
+            cache=tool_cache,
+            argument_schemas=argument_schemas,
+        )
+
+    return decorator